@@ -0,0 +1,75 @@
+"""
+Benchmark of the JSON codec on realistic RTM traffic.
+
+Decodes a mix of RTM frames, as text and as bytes, and encodes poll
+attachments with the standard library and with :py:mod:`votebot.codec`.
+
+.. code-block:: shell
+
+    $ pip install slack-votebot[fast]
+    $ python benchmarks/bench_codec.py
+
+"""
+
+import json
+import timeit
+
+from votebot import codec
+
+PROFILE = {
+    'real_name': 'John Doe',
+    'display_name': 'john',
+    'status_text': 'Riding a train',
+    'status_emoji': ':mountain_railway:',
+    'image_24': 'https://example.org/john_24.png',
+    'image_72': 'https://example.org/john_72.png',
+    'image_192': 'https://example.org/john_192.png',
+}
+
+FRAMES = [
+    {'type': 'user_typing', 'channel': 'C024BE91L', 'user': 'U024BE7LH'},
+    {'type': 'presence_change', 'user': 'U024BE7LH', 'presence': 'away'},
+    {'type': 'message', 'channel': 'D024BE91L', 'user': 'U024BE7LH',
+     'text': 'Lunch?\nWhere do we go today? :pizza: :sushi: :taco:',
+     'ts': '1355517523.000005', 'team': 'T024BE7LD'},
+    {'type': 'reaction_added', 'user': 'U024BE7LH', 'reaction': 'pizza',
+     'item_user': 'U0G9QF9C6', 'event_ts': '1360782804.083113',
+     'item': {'type': 'message', 'channel': 'C0G9QF9GZ',
+              'ts': '1360782400.498405'}},
+    {'type': 'user_change',
+     'user': {'id': 'U024BE7LH', 'name': 'john', 'deleted': False,
+              'tz': 'Europe/Zurich', 'profile': PROFILE}},
+]
+
+ATTACHMENTS = [{
+    'title': 'Lunch?',
+    'text': 'Where do we go today?',
+    'mrkdwn_in': ['text'],
+    'fields': [{'title': ':pizza: 12', 'value': ', '.join(['john'] * 12)},
+               {'title': ':sushi: 7', 'value': ', '.join(['frank'] * 7)}],
+}]
+
+
+def main():
+    """Run the benchmark."""
+    texts = [json.dumps(f) for f in FRAMES] * 200
+    raws = [t.encode('utf-8') for t in texts]
+    number = 20
+
+    print('codec: {0}'.format(codec.NAME))
+    for name, func, data in (
+            ('json.loads(str)', json.loads, texts),
+            ('codec.loads(str)', codec.loads, texts),
+            ('json.loads(bytes)', lambda b: json.loads(b.decode('utf-8')),
+             raws),
+            ('codec.loads(bytes)', codec.loads, raws),
+            ('json.dumps', json.dumps, [ATTACHMENTS] * 1000),
+            ('codec.dumps', codec.dumps, [ATTACHMENTS] * 1000)):
+        best = min(timeit.repeat(lambda: [func(d) for d in data],
+                                 number=number, repeat=5))
+        print('{0:>20}: {1:6.2f}us per document'
+              .format(name, best / number / len(data) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
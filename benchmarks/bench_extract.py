@@ -0,0 +1,56 @@
+"""
+Micro-benchmark of :py:func:`votebot.utils.extract`.
+
+Compares the single pass tokenizer with the former implementation based on
+a placeholder substitution and several regular expressions.
+
+.. code-block:: shell
+
+    $ python benchmarks/bench_extract.py
+
+"""
+
+import re
+import timeit
+
+from votebot.utils import extract
+
+MESSAGES = (
+    'Lunch? :pizza: :hamburger: :sushi: :taco:',
+    'Which one?\nA longer description of the\n*choices* :one::two::three:',
+    '<@U1> vs <@U2> :snake: :space_invader:',
+    'Hello :+1:? :-1:',
+    '? :nose::skin-tone-1::nose: :ear::skin-tone-3:, :eye:',
+    'No emoji at all, the defaults are used.',
+    'A ' * 200 + ':a: :b: :c:',
+)
+
+
+def reference_extract(message):
+    """Former implementation."""
+    message = re.sub(r'::skin-tone-', '§§skin-tone-', message)
+    match = re.search(r':[:a-zA-Z0-9+\-_, §]+$', message)
+    if not match:
+        return message, [':+1:', ':heart:']
+
+    query = message[0:match.span()[0]].strip()
+    emojis = re.split('[, ]',
+                      match.group(0)
+                           .replace('::', ': :')
+                           .replace('§§skin-tone', '::skin-tone'))
+    return query, emojis
+
+
+def main():
+    """Run the benchmark."""
+    number = 20000
+    for name, func in (('reference', reference_extract),
+                       ('extract', extract)):
+        best = min(timeit.repeat(lambda: [func(m) for m in MESSAGES],
+                                 number=number, repeat=5))
+        print('{0:>10}: {1:6.2f}us per message'
+              .format(name, best / number / len(MESSAGES) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Memory benchmark of the open polls.
+
+Compares the former state of an open poll, spread across a tally, a stored
+record and the arguments of its timer, with a :py:class:`votebot.poll.Poll`,
+for 100k polls of 3 options and 5 votes each. The
+:py:class:`votebot.results.Tally` of a poll is only built once its results
+are shown, or from the start for instant-runoff, so both are measured. Then
+compares the voters of an all-hands poll, as lists of user ids or as
+bitsets.
+
+.. code-block:: shell
+
+    $ python benchmarks/bench_polls.py
+
+"""
+
+import time
+import tracemalloc
+
+from votebot.poll import Poll, PollRegistry
+from votebot.results import Tally
+from votebot.users import UserIndex
+
+POLLS = 100000
+OPTIONS = ('pizza', 'sushi', 'taco')
+
+
+def former(users):
+    """Tallies, records and timer arguments of the polls."""
+    tallies, records, timers = {}, [], []
+    for i in range(POLLS):
+        channel, ts = 'C1', '{0}.000100'.format(1e9 + i)
+        tally = tallies[channel, ts] = {}
+        for j, user in enumerate(users):
+            tally.setdefault(OPTIONS[j % len(OPTIONS)], []).append(user)
+        record = {'team': 'T1', 'channel': channel, 'ts': ts,
+                  'title': 'Question {0}?'.format(i), 'text': '',
+                  'deadline': time.time() + 60}
+        records.append(record)
+        timers.append((record['title'], record['text'], ts, channel))
+    return tallies, records, timers
+
+
+def current(users, tally=False):
+    """Registry of the polls and timer arguments."""
+    polls, timers = PollRegistry(), []
+    for i in range(POLLS):
+        # The names come from parsing each message.
+        options = [':{0}:'.format(name).strip(':') for name in OPTIONS]
+        poll = Poll('C1', '{0}.000100'.format(1e9 + i),
+                    'Question {0}?'.format(i), '', time.time() + 60,
+                    options)
+        if tally:
+            poll.results = Tally(poll.options, ignore=poll.users.number('U0'))
+        # Each poll numbers its voters.
+        for j, user in enumerate(users):
+            poll.vote(poll.options[j % len(OPTIONS)], poll.users.number(user))
+        polls.add(poll)
+        timers.append((poll,))
+    return polls, timers
+
+
+def measure(build):
+    """Bytes allocated per poll."""
+    users = ['U{0:08d}'.format(i) for i in range(5)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    polls = build(users)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del polls
+    return (after - before) / POLLS
+
+
+def all_hands(voters=5000):
+    """Bytes taken by the voters of a poll, as lists and as bitsets."""
+    users = ['U{0:08d}'.format(i) for i in range(voters)]
+    index = UserIndex()
+    for user in users:
+        index.number(user)
+
+    # The ids themselves are shared with the rest of the bot.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    lists = [list(users[i::len(OPTIONS)]) for i in range(len(OPTIONS))]
+    middle = tracemalloc.get_traced_memory()[0]
+    bitsets = [index.bits(users[i::len(OPTIONS)])
+               for i in range(len(OPTIONS))]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del lists, bitsets
+    return middle - before, after - middle
+
+
+def main():
+    """Run the benchmark."""
+    for name, build in (('former', former),
+                        ('poll', current),
+                        ('tally', lambda users: current(users, True))):
+        size = measure(build)
+        print('{0:>7}: {1:5.0f} bytes per poll, {2:5.1f}MB per 100k'
+              .format(name, size, size * 1e5 / 2**20))
+
+    lists, bitsets = all_hands()
+    print('5000 voters: {0} bytes as lists, {1} bytes as bitsets'
+          .format(lists, bitsets))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark of the results of a busy poll.
+
+A flurry of reactions on a poll with many options, its live results being
+rendered after each batch of votes. Compares counting the bitsets of the
+voters and sorting at each render with a :py:class:`votebot.results.Tally`
+following the votes.
+
+.. code-block:: shell
+
+    $ python benchmarks/bench_results.py --options 50 --voters 5000
+
+"""
+
+import argparse
+import random
+import time
+
+from votebot.poll import Poll, popcount
+from votebot.results import Tally
+
+
+def recount(poll):
+    """Former rendering, the options are counted again."""
+    return sorted(((popcount(poll.voters(name)), name)
+                   for name in poll.options),
+                  key=lambda r: -r[0])
+
+
+def run(args, tally):
+    """Vote and render, return the seconds spent."""
+    rng = random.Random(42)
+    options = ['e{0}'.format(i) for i in range(args.options)]
+    poll = Poll('C1', '1.0', 'Question?', '', 0, options)
+    if tally:
+        poll.results = Tally(poll.options)
+    # Some options are more popular than others.
+    weights = [1 / (i + 1) for i in range(args.options)]
+
+    start = time.perf_counter()
+    for i in range(args.voters):
+        for name in rng.choices(options, weights, k=3):
+            poll.vote(name, i)
+        if i % args.batch == 0:
+            if tally:
+                poll.results.ranking(args.top)
+            else:
+                recount(poll)[:args.top]
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--options', type=int, default=50)
+    parser.add_argument('--voters', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=10,
+                        help='votes between two renders')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    for name, tally in (('recount', False), ('tally', True)):
+        elapsed = run(args, tally)
+        print('{0:>8}: {1:7.1f}ms'.format(name, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main()
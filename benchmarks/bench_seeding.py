@@ -0,0 +1,94 @@
+"""
+Benchmark of the reaction seeding of new polls, against a local fake Slack.
+
+Compares sending all the ``reactions.add`` of a poll at once, as the bot
+formerly did, with :py:meth:`votebot.bot.Bot.seed_reactions`. The rate limits
+are sped up by ``--scale`` on both sides so that the run stays short.
+
+.. code-block:: shell
+
+    $ python benchmarks/bench_seeding.py --polls 20 --options 10
+
+"""
+
+import argparse
+import asyncio
+import time
+
+from votebot.api import Client
+from votebot.bot import Bot
+from votebot.ratelimit import METHOD_TIERS, PRIORITY_REACTIONS, TIERS
+from votebot.testing import FakeSlack
+
+
+@asyncio.coroutine
+def seed_at_once(bot, channel, ts, emojis):
+    """Former implementation."""
+    yield from asyncio.wait([bot.call_nowait('reactions.add',
+                                             priority=PRIORITY_REACTIONS,
+                                             name=emoji.strip(':'),
+                                             channel=channel,
+                                             timestamp=ts)
+                             for emoji in emojis])
+
+
+@asyncio.coroutine
+def run(seed, args):
+    """Seed the polls and measure them."""
+    rates = {m: TIERS[t] for m, t in METHOD_TIERS.items()}
+    slack = FakeSlack(latency=args.latency, jitter=args.latency,
+                      rate_limits=rates)
+    yield from slack.start()
+    client = Client(base_url=slack.api_url)
+    bot = Bot('xoxb-fake', client=client)
+
+    emojis = [':e{0}:'.format(i) for i in range(args.options)]
+    polls = [slack.api_chat_postMessage({'channel': 'C00000000'})['ts']
+             for _ in range(args.polls)]
+
+    @asyncio.coroutine
+    def timed(ts):
+        start = time.monotonic()
+        yield from seed(bot, 'C00000000', ts, emojis)
+        return time.monotonic() - start
+
+    ready = yield from asyncio.gather(*[timed(ts) for ts in polls])
+
+    names = [e.strip(':') for e in emojis]
+    ordered = sum(list(m['reactions']) == names for m in slack.polls())
+
+    bot.scheduler.close()
+    client.close()
+    yield from slack.close()
+    return {'ready': sum(ready) / len(ready),
+            'ready_max': max(ready),
+            'limited': slack.limited['reactions.add'],
+            'ordered': ordered}
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--polls', type=int, default=20)
+    parser.add_argument('--options', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--scale', type=float, default=60,
+                        help='speed up of the rate limits')
+    args = parser.parse_args(argv)
+
+    for tier in TIERS:
+        TIERS[tier] *= args.scale
+
+    loop = asyncio.get_event_loop()
+    for name, seed in (('at once', seed_at_once),
+                       ('seeded', Bot.seed_reactions)):
+        results = loop.run_until_complete(run(seed, args))
+        print('{0:>8}: ready in {1:.2f}s (max {2:.2f}s), {3} rate limited, '
+              '{4}/{5} polls in order'
+              .format(name, results['ready'], results['ready_max'],
+                      results['limited'], results['ordered'], args.polls))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
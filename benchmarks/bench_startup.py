@@ -0,0 +1,72 @@
+"""
+Benchmark of the startup of the package.
+
+Measures, in fresh interpreters, importing the package, running
+``python -m votebot`` without any configuration, and importing the bot, and
+whether aiohttp got loaded.
+
+.. code-block:: shell
+
+    $ python benchmarks/bench_startup.py
+
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+SCENARIOS = (
+    ('python', 'pass'),
+    ('import votebot', 'import votebot'),
+    ('import votebot.utils', 'from votebot import extract'),
+    ('python -m votebot', 'import runpy; runpy.run_module("votebot", '
+                          'run_name="__main__")'),
+    ('import votebot.bot', 'from votebot import Bot'),
+)
+
+REPORT = ('import sys; print("aiohttp" in sys.modules, '
+          '"pkg_resources" in sys.modules)')
+
+
+def measure(code, repeat):
+    """Best wall time of running the code in a new interpreter."""
+    env = dict(os.environ)
+    env.pop('SLACK_TOKEN', None)
+    env.pop('VOTEBOT_CONFIG', None)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.call([sys.executable, '-c', code], env=env,
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # SystemExit is expected from __main__.
+    try:
+        out = subprocess.check_output(
+            [sys.executable, '-c',
+             'try:\n {0}\nexcept SystemExit:\n pass\n{1}'
+             .format(code, REPORT)],
+            env=env, stderr=subprocess.DEVNULL)
+    except subprocess.CalledProcessError:
+        return None, False, False
+    aiohttp, pkg_resources = out.decode('ascii').split()
+    return best, aiohttp == 'True', pkg_resources == 'True'
+
+
+def main():
+    """Run the benchmark."""
+    for name, code in SCENARIOS:
+        best, aiohttp, pkg_resources = measure(code, 10)
+        if best is None:
+            print('{0:>22}: failed'.format(name))
+            continue
+        print('{0:>22}: {1:6.1f}ms{2}{3}'
+              .format(name, best * 1e3,
+                      ', aiohttp' if aiohttp else '',
+                      ', pkg_resources' if pkg_resources else ''))
+
+
+if __name__ == '__main__':
+    main()
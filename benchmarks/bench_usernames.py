@@ -0,0 +1,64 @@
+"""
+Benchmark of the user name resolution.
+
+Compares the former linear scan of the ``rtm.start`` users with the cache
+of :py:meth:`votebot.bot.Bot.usernames`, for a poll with 5 options of 20
+voters each. All the users are cached, as if they had been seen before.
+
+.. code-block:: shell
+
+    $ python benchmarks/bench_usernames.py
+
+"""
+
+import asyncio
+import random
+import timeit
+
+from votebot.bot import Bot
+from votebot.users import UserCache
+
+
+def linear_usernames(rtm, *ids):
+    """Former implementation, scanning all the users."""
+    ids = set(ids)
+    me = rtm['self']['id']
+    if me in ids:
+        ids.remove(me)
+    for user in rtm['users']:
+        if user['id'] in ids:
+            ids.remove(user['id'])
+            yield user['name']
+    for id_ in ids:
+        yield '<@{0}>'.format(id_)
+
+
+def main():
+    """Run the benchmark."""
+    loop = asyncio.get_event_loop()
+    for size in (10000, 100000):
+        users = [{'id': 'U{0:08d}'.format(i), 'name': 'user{0}'.format(i)}
+                 for i in range(size)]
+        rtm = {'self': {'id': 'U00000000'}, 'users': users}
+        bot = Bot('xoxb-123')
+        bot.rtm = rtm
+        bot.users = UserCache(None, size=size)
+        bot.index_users(users)
+        options = [[u['id'] for u in random.sample(users, 20)]
+                   for _ in range(5)]
+
+        linear = min(timeit.repeat(
+            lambda: [list(linear_usernames(rtm, *o)) for o in options],
+            number=10, repeat=3)) / 10
+        indexed = min(timeit.repeat(
+            lambda: loop.run_until_complete(asyncio.gather(
+                *[bot.usernames(*o) for o in options])),
+            number=10, repeat=3)) / 10
+
+        print('{0:>7} users: linear {1:8.3f}ms, cached {2:8.3f}ms '
+              '(x{3:.0f})'.format(size, linear * 1e3, indexed * 1e3,
+                                  linear / indexed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Load benchmark of a :py:class:`votebot.bot.Bot` against a local fake Slack.
+
+Thousands of users send polls to the bot and vote on them, while the event
+loop lag is sampled. The bot and the fake server share the same loop, the
+figures are meant to be compared between two revisions, not taken as is.
+
+.. code-block:: shell
+
+    $ python benchmarks/load.py --polls 2000 --votes 20 --latency 0.005
+
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import sys
+import time
+
+from votebot.api import Client
+from votebot.bot import Bot
+from votebot.testing import FakeSlack
+
+EMOJIS = ('pizza', 'sushi', 'taco', 'hamburger', 'ramen', 'burrito')
+
+
+@asyncio.coroutine
+def sample_lag(samples, interval=0.01):
+    """Measure how late the loop wakes us up."""
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        yield from asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+@asyncio.coroutine
+def send_polls(slack, args):
+    """Send the direct messages, at the given rate."""
+    for i in range(args.polls):
+        user = random.choice(slack.users[:-1])['id']
+        emojis = random.sample(EMOJIS, args.options)
+        slack.dm(user, 'Poll {0}? {1}'.format(
+            i, ' '.join(':{0}:'.format(e) for e in emojis)))
+        yield from asyncio.sleep(1 / args.rate)
+
+
+@asyncio.coroutine
+def vote(slack, args):
+    """Make the users react to the seeded polls."""
+    voted = set()
+    users = [u['id'] for u in slack.users[:-1]]
+    while True:
+        yield from asyncio.sleep(0.05)
+        for poll in slack.polls():
+            key = poll['channel'], poll['ts']
+            options = list(poll['reactions'])
+            if key in voted or len(options) < args.options:
+                continue
+            voted.add(key)
+            for user in random.sample(users, min(args.votes, len(users))):
+                slack.react(user, poll['channel'], poll['ts'],
+                            random.choice(options))
+
+
+@asyncio.coroutine
+def run(args):
+    """Run the scenario and collect the figures."""
+    slack = FakeSlack(users=args.users,
+                      latency=args.latency,
+                      jitter=args.latency,
+                      rate_limits=args.rate_limits or None)
+    yield from slack.start()
+
+    client = Client(base_url=slack.api_url)
+    bot = Bot('xoxb-fake', channel='general', timeout=args.timeout,
+              client=client)
+    future = bot.connect()
+    yield from slack.connected.wait()
+
+    lags = []
+    tasks = [asyncio.ensure_future(sample_lag(lags)),
+             asyncio.ensure_future(vote(slack, args))]
+    calls = sum(slack.calls.values())
+    start = time.monotonic()
+    yield from send_polls(slack, args)
+    # Every poll is deleted once its results are posted.
+    while slack.calls['chat.delete'] < args.polls:
+        yield from asyncio.sleep(0.05)
+    elapsed = time.monotonic() - start
+    calls = sum(slack.calls.values()) - calls
+
+    for task in tasks:
+        task.cancel()
+    bot.future.set_result(None)
+    yield from future
+    # Let the listener close its connection.
+    yield from asyncio.sleep(0.1)
+    client.close()
+    yield from slack.close()
+
+    lags.sort()
+    return {'elapsed': elapsed,
+            'polls': args.polls / elapsed,
+            'calls': calls / elapsed,
+            'limited': sum(slack.limited.values()),
+            'lag_p99': lags[int(len(lags) * 0.99)] if lags else 0,
+            'lag_max': lags[-1] if lags else 0}
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--polls', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=500,
+                        help='polls sent per second')
+    parser.add_argument('--options', type=int, default=3)
+    parser.add_argument('--votes', type=int, default=10,
+                        help='voters per poll')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--timeout', type=float, default=2,
+                        help='duration of the polls')
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--rate-limits', action='store_true',
+                        help='enforce the Slack rate limits')
+    args = parser.parse_args(argv)
+
+    loop = asyncio.get_event_loop()
+    results = loop.run_until_complete(run(args))
+    loop.close()
+
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+
+    print('{0:.1f}s, {1:.1f} polls/s, {2:.1f} calls/s, {3} rate limited'
+          .format(results['elapsed'], results['polls'], results['calls'],
+                  results['limited']))
+    print('loop lag: p99 {0:.1f}ms, max {1:.1f}ms'
+          .format(results['lag_p99'] * 1e3, results['lag_max'] * 1e3))
+    print('max RSS: {0:.1f}MB'.format(rss / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,10 +9,16 @@ here = path.abspath(path.dirname(__file__))
 with open(path.join(here, 'README.rst'), 'r', encoding='utf-8') as f:
     long_description = f.read()
 
+# The package itself imports aiohttp, its version is read without it.
+about = {}
+with open(path.join(here, 'votebot', '_version.py'), 'r',
+          encoding='utf-8') as f:
+    exec(f.read(), about)
+
 
 setup(
     name="slack-votebot",
-    version="0.0.1b2.dev20160608",
+    version=about['__version__'],
     author="Yoan Blanc",
     author_email="yoan@dosimple.ch",
     homepage="https://github.com/HE-Arc/votebot",
@@ -32,10 +38,15 @@ setup(
         "Programming Language :: Python :: 3 :: Only"
     ),
     install_requires=(
-        'aiohttp'
+        # MsgType, Timeout and FormData(encoding) are gone in 2.0.
+        'aiohttp>=1.0,<2.0',
     ),
     extras_require={
-        'fast': ('cchardet',),
+        'fast': (
+            'cchardet',
+            'orjson; python_version >= "3.6"',
+            'ujson'
+        ),
         'docs': ('sphinx',),
         'tests': (
             'asynctest',
@@ -1,11 +1,14 @@
 import asyncio
+import sys
 
 from urllib.parse import urlencode
 
 import pytest
+from aiohttp import FormData
 
-from asynctest import patch
-from votebot.api import call
+from asynctest import MagicMock, Mock, patch
+from votebot.api import Client, call
+from votebot.codec import dumps
 
 
 @pytest.fixture(scope='session')
@@ -48,7 +51,7 @@ class MockResponse:
         pass
 
     @asyncio.coroutine
-    def json(self):
+    def json(self, **kwargs):
         return {'ok': False,
                 'error': 'I am a mock',
                 'args': self.args,
@@ -76,7 +79,7 @@ def test_api_subfields():
         response = yield from call('api.dummy', fields=[1, 2, 3])
 
     data = response['kwargs']['data']('utf-8')
-    assert urlencode({'fields': '[1, 2, 3]'}).encode('utf-8') == data
+    assert urlencode({'fields': dumps([1, 2, 3])}).encode('utf-8') == data
 
 
 @pytest.mark.asyncio
@@ -88,3 +91,130 @@ def test_api_file(hello_file):
 
     data = response['kwargs']['data']
     assert data.is_multipart
+
+
+class UploadFormData(FormData):
+    """Keeps the uploaded file at hand."""
+
+    def add_field(self, name, value, **kwargs):
+        if name == 'file':
+            self.upload = value
+        super().add_field(name, value, **kwargs)
+
+
+def read_upload(response):
+    upload = response['kwargs']['data'].upload
+    chunks = []
+    while True:
+        chunk = upload.read(4)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_api_file_path(hello_file):
+    progress = []
+
+    with patch('votebot.api.ClientSession', new=MockClientSession), \
+            patch('votebot.api.FormData', new=UploadFormData), \
+            patch('votebot.api._Upload.close'):
+        response = yield from call('files.upload', file=hello_file,
+                                   progress=lambda *a: progress.append(a))
+
+    assert b'Hello world!\n' == read_upload(response)
+    assert [(4, 13), (8, 13), (12, 13), (13, 13)] == progress
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_api_file_buffer():
+    content = bytearray(b'Hello world!')
+
+    with patch('votebot.api.ClientSession', new=MockClientSession), \
+            patch('votebot.api.FormData', new=UploadFormData), \
+            patch('votebot.api._Upload.close'):
+        response = yield from call('files.upload', file=memoryview(content))
+
+    assert b'Hello world!' == read_upload(response)
+
+
+class Chunks:
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5),
+                    reason='asynchronous iterators need Python 3.5')
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_api_file_async_iterator(monkeypatch):
+    monkeypatch.setattr('votebot.api.SPOOL_MAX_SIZE', 4)
+    progress = []
+
+    with patch('votebot.api.ClientSession', new=MockClientSession), \
+            patch('votebot.api.FormData', new=UploadFormData), \
+            patch('votebot.api._Upload.close'):
+        response = yield from call('files.upload',
+                                   file=Chunks(b'Hello', b' ', b'world!'),
+                                   progress=lambda *a: progress.append(a))
+
+    assert b'Hello world!' == read_upload(response)
+    assert (12, 12) == progress[-1]
+
+
+class MockPooledSession(MockSession):
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_api_client_reuses_session():
+    with patch('votebot.api.ClientSession', new=MockPooledSession), \
+            patch('votebot.api.TCPConnector') as connector:
+        client = Client(limit=3)
+        yield from client.call('api.test', token='xoxb-123')
+        session = client.session
+        response = yield from client.call('api.test', token='xoxb-123')
+
+    assert session is client.session, "The session is shared."
+    assert ('https://slack.com/api/api.test',) == response['args']
+    assert 3 == connector.call_args[1]['limit']
+    assert 'limit_per_host' not in connector.call_args[1], "aiohttp 1.x"
+    assert connector.call_args[1]['use_dns_cache']
+
+    client.close()
+    assert session.closed
+    assert client.closed
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_api_file_timeout(hello_file, monkeypatch):
+    """The uploads get a longer timeout, not an infinite one."""
+    monkeypatch.setattr('votebot.api.UPLOAD_TIMEOUT', 60)
+    timeouts = []
+
+    with patch('votebot.api.ClientSession', new=MockClientSession), \
+            patch('votebot.api.Timeout', new=Mock(side_effect=lambda t: (
+                timeouts.append(t) or MagicMock()))):
+        yield from call('api.test')
+        yield from call('files.upload', file=hello_file)
+
+    assert [10, 60] == timeouts
@@ -2,8 +2,10 @@ import asyncio
 
 import pytest
 
-from asynctest import patch
+from asynctest import CoroutineMock, Mock, patch
+from votebot.api import ApiError
 from votebot.bot import Bot
+from votebot.poll import Poll
 
 
 @pytest.fixture()
@@ -22,13 +24,15 @@ def test_bot_api_test(bot):
             return args, kwargs
         return call
 
-    with patch('votebot.bot.call', new_callable=mock):
+    with patch.object(bot.client, 'call', new_callable=mock):
         args, kwargs = yield from bot.call('api.test')
 
     assert ('api.test',) == args
     assert 'xoxb-123' == kwargs['token']
 
 
+@pytest.mark.asyncio
+@asyncio.coroutine
 def test_bot_usernames(monkeypatch, bot):
     """Test that the usernames are correct even when missing."""
     monkeypatch.setattr(bot, 'rtm', {
@@ -39,9 +43,446 @@ def test_bot_usernames(monkeypatch, bot):
             {'id': 'U2', 'name': 'frank'},
         ]
     })
+    bot.index_users(bot.rtm['users'])
+
+    responses = {'U3': {'ok': False, 'error': 'user_not_found'},
+                 'U4': {'ok': True, 'user': {'id': 'U4', 'name': 'jane'}}}
+
+    @asyncio.coroutine
+    def call(method, user):
+        assert 'users.info' == method
+        return responses[user]
 
-    names = list(bot.usernames('U0', 'U1', 'U2', 'U3'))
+    with patch.object(bot, 'call', new=CoroutineMock(side_effect=call)):
+        names = yield from bot.usernames('U0', 'U1', 'U2', 'U3', 'U4', 'U1')
     assert 'bot' not in names, "Self shouldn't appear."
     assert 'john' in names
     assert 'frank' in names
     assert '<@U3>' in names, "Unknown users still appear."
+    assert 'jane' in names, "Missing users are fetched."
+    assert 1 == names.count('john')
+    assert 'U4' in bot.users
+
+
+def reaction(type_, user, name, ts='1.0'):
+    return {'type': type_,
+            'user': user,
+            'reaction': name,
+            'item': {'type': 'message', 'channel': 'C1', 'ts': ts}}
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_incremental_tally(monkeypatch, bot):
+    """Closing a poll doesn't need to fetch the reactions."""
+    monkeypatch.setattr(bot, 'rtm', {
+        'self': {'id': 'U0', 'name': 'bot'},
+        'users': [
+            {'id': 'U0', 'name': 'bot'},
+            {'id': 'U1', 'name': 'john'},
+        ]
+    })
+    bot.index_users(bot.rtm['users'])
+    bot.channel_id = 'C1'
+    poll = Poll('C1', '1.0', 'Title', 'Text', 0, ['+1', 'heart'])
+    bot.polls.add(poll)
+
+    for event in (reaction('reaction_added', 'U0', '+1'),
+                  reaction('reaction_added', 'U1', '+1'),
+                  reaction('reaction_added', 'U1', 'heart'),
+                  reaction('reaction_removed', 'U1', 'heart'),
+                  reaction('reaction_added', 'U1', 'heart', ts='2.0')):
+        yield from bot.on_message(event)
+
+    assert ['+1'] == list(poll.votes)
+    assert ['U0', 'U1'] == poll.users.ids(poll.voters('+1'))
+
+    calls = []
+    with patch.object(bot, 'call', side_effect=AssertionError), \
+            patch.object(bot, 'call_nowait',
+                         side_effect=lambda *a, **kw: calls.append((a, kw))):
+        yield from bot.cast_votes(poll)
+
+    (method,), kwargs = calls[0]
+    assert 'chat.postMessage' == method
+    assert [{'title': ':+1: 1', 'value': 'john'}] == \
+        kwargs['attachments'][0]['fields']
+    assert ('C1', '1.0') not in bot.polls
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+@pytest.mark.parametrize('fetched', [
+    {'return_value': {'ok': False, 'error': 'message_not_found'}},
+    {'side_effect': ApiError('reactions.get', 500)},
+])
+def test_bot_cast_votes_stale(monkeypatch, bot, fetched):
+    """The votes of the events are used when they cannot be fetched."""
+    monkeypatch.setattr(bot, 'rtm', {'self': {'id': 'U0', 'name': 'bot'},
+                                     'team': {'id': 'T1'}})
+    bot.index_users([{'id': 'U1', 'name': 'john'}])
+    bot.store = Mock()
+    poll = Poll('C1', '1.0', 'Title', 'Text', 0, ['+1'])
+    bot.polls.add(poll)
+    for user in ('U0', 'U1'):
+        yield from bot.on_message(reaction('reaction_added', user, '+1'))
+    poll.stale = True
+
+    calls = []
+    with patch.object(bot, 'call', new=CoroutineMock(**fetched)), \
+            patch.object(bot, 'call_nowait',
+                         side_effect=lambda *a, **kw: calls.append((a, kw))):
+        yield from bot.cast_votes(poll)
+
+    (method,), kwargs = calls[0]
+    assert 'chat.postMessage' == method
+    assert [{'title': ':+1: 1', 'value': 'john'}] == \
+        kwargs['attachments'][0]['fields']
+    bot.store.remove.assert_called_once_with('T1', 'C1', '1.0')
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_live_results(monkeypatch):
+    """Many reactions lead to a single update of the poll."""
+    bot = Bot('xoxb-123', channel='test', live=True)
+    bot.live.delay = 0.01
+    monkeypatch.setattr(bot, 'rtm', {'self': {'id': 'U0', 'name': 'bot'}})
+    bot.index_users([{'id': 'U1', 'name': 'john'}])
+    poll = Poll('C1', '1.0', 'Lunch?', '', 0, ['pizza', 'sushi'],
+                author='U1')
+    bot.polls.add(poll)
+
+    events = [reaction('reaction_added', 'U0', 'pizza'),
+              reaction('reaction_added', 'U0', 'sushi')]
+    for i in range(2, 100):
+        events.append(reaction('reaction_added', 'U{0}'.format(i),
+                               'pizza' if i % 3 else 'sushi'))
+    calls = []
+    with patch.object(bot, 'call_nowait',
+                      side_effect=lambda *a, **kw: calls.append((a, kw))):
+        for event in events:
+            yield from bot.on_message(event)
+        yield from asyncio.sleep(0.03)
+        assert poll.results is not None, "Followed once shown."
+
+        # Unchanged counts aren't sent again.
+        yield from bot.on_message(reaction('reaction_added', 'U1', 'heart'))
+        yield from asyncio.sleep(0.03)
+    bot.timers.close()
+
+    assert 1 == len(calls)
+    (method,), kwargs = calls[0]
+    assert 'chat.update' == method
+    assert '1.0' == kwargs['ts']
+    fields = kwargs['attachments'][0]['fields']
+    assert 'john' == fields[0]['value']
+    assert [':pizza: 65', ':sushi: 33'] == [f['title'] for f in fields[2:]]
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_user_events(monkeypatch, bot):
+    monkeypatch.setattr(bot, 'rtm', {'self': {'id': 'U0', 'name': 'bot'}})
+
+    yield from bot.on_message({'type': 'team_join',
+                               'user': {'id': 'U1', 'name': 'john'}})
+    yield from bot.on_message({'type': 'user_change',
+                               'user': {'id': 'U1', 'name': 'johnny'}})
+
+    assert ['johnny'] == (yield from bot.usernames('U1'))
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_run_pages(bot):
+    """Only the projections of the paginated lists are kept."""
+    pages = {
+        'rtm.connect': [{'ok': True,
+                         'url': 'wss://example.org/',
+                         'self': {'id': 'U0', 'name': 'bot', 'prefs': {}},
+                         'team': {'id': 'T0', 'domain': 'example'}}],
+        'conversations.list': [
+            {'ok': True,
+             'channels': [{'id': 'C1', 'name': 'general'}],
+             'response_metadata': {'next_cursor': 'def'}},
+            {'ok': True,
+             'channels': [{'id': 'G2', 'name': 'test'}],
+             'response_metadata': {'next_cursor': 'ghi'}},
+            {'ok': True,
+             'channels': [{'id': 'C3', 'name': 'random'}],
+             'response_metadata': {'next_cursor': ''}},
+        ],
+    }
+    calls = []
+
+    @asyncio.coroutine
+    def call(method, **kwargs):
+        calls.append((method, kwargs.get('cursor')))
+        return pages[method].pop(0)
+
+    with patch.object(bot, 'call', new=call), \
+            patch.object(bot, '_consume', new=CoroutineMock()), \
+            patch.object(bot, '_listen', new=CoroutineMock()):
+        yield from bot._run()
+
+    assert 'G2' == bot.channel_id
+    assert not len(bot.users), "The users are not preloaded."
+    assert 'prefs' not in bot.rtm['self']
+    assert ('conversations.list', 'def') in calls
+    assert not pages['conversations.list']
+    assert 'C3' == bot.directory.id_for('random'), "All the channels."
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_connect_retries(monkeypatch):
+    """The first connection is retried, then the bot stops on errors."""
+    bot = Bot('xoxb-123', channel='test')
+    monkeypatch.setattr('votebot.bot.RECONNECT_BASE', 0)
+    rtm = {'ok': True,
+           'url': 'wss://example.org/',
+           'self': {'id': 'U0', 'name': 'bot'},
+           'team': {'id': 'T1', 'domain': 'example'}}
+    responses = [OSError('Connection refused'), rtm,
+                 {'ok': False, 'error': 'invalid_auth'}]
+
+    def call(method, **kwargs):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    with patch.object(bot, 'call', new=CoroutineMock(side_effect=call)):
+        result = yield from asyncio.wait_for(bot.connect(), 1)
+
+    assert isinstance(result, ValueError)
+    assert 'invalid_auth' == str(result)
+    assert not responses
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_reconnect(monkeypatch, bot):
+    """The listener reconnects until the bot is closed."""
+    monkeypatch.setattr('votebot.bot.RECONNECT_BASE', 0)
+    bot.rtm = {'url': 'wss://example.org/0'}
+    urls = []
+
+    def receive(url):
+        urls.append(url)
+        if len(urls) == 1:
+            raise OSError('Connection refused')
+        if len(urls) == 3:
+            bot.future.set_result(None)
+        return True
+
+    rtm = {'ok': True, 'url': 'wss://example.org/1'}
+    receive = CoroutineMock(side_effect=receive)
+    with patch.object(bot, '_receive', new=receive), \
+            patch.object(bot, 'call', new=CoroutineMock(return_value=rtm)):
+        yield from asyncio.wait_for(bot._listen(), 1)
+
+    assert ['wss://example.org/0',
+            'wss://example.org/1',
+            'wss://example.org/1'] == urls
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_listen_cancelled(bot):
+    """Cancelling the listener isn't a connection failure."""
+    bot.rtm = {'url': 'wss://example.org/0'}
+    receive = CoroutineMock(side_effect=asyncio.CancelledError)
+    with patch.object(bot, '_receive', new=receive), \
+            patch.object(bot, 'log') as log:
+        with pytest.raises(asyncio.CancelledError):
+            yield from bot._listen()
+
+    assert not log.exception.called
+    assert not log.warning.called, "No reconnection."
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_target_channel(monkeypatch, bot):
+    """A DM starting with a known channel is posted there."""
+    monkeypatch.setattr(bot, 'rtm', {'self': {'id': 'U0', 'name': 'bot'}})
+    bot.channel_id = 'C1'
+    bot.channel_ids = {'test': 'C1', 'dev': 'C2'}
+    bot.directory.update([{'id': 'C1', 'name': 'test'},
+                          {'id': 'C2', 'name': 'dev'},
+                          {'id': 'C3', 'name': 'ops'}])
+    bot.index_users([{'id': 'U1', 'name': 'john'}])
+
+    posted = []
+
+    @asyncio.coroutine
+    def call(method, **kwargs):
+        posted.append(kwargs)
+        return {'ok': True, 'channel': kwargs['channel'], 'ts': '1.0'}
+
+    with patch.object(bot, 'call', new=call), \
+            patch.object(bot, 'call_nowait'):
+        for text in ('<#C2|dev> Lunch? :pizza:',
+                     '<#C3|ops> Lunch? :pizza:'):
+            yield from bot.on_message({'type': 'message',
+                                       'channel': 'D1',
+                                       'user': 'U1',
+                                       'text': text})
+    bot.timers.close()
+
+    assert 'C2' == posted[0]['channel']
+    assert 'Lunch?' == posted[0]['attachments'][0]['title']
+    assert 'C1' == posted[1]['channel'], "Unknown channels are ignored."
+    assert '<#C3|ops> Lunch?' == posted[1]['attachments'][0]['title']
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_channel_events(monkeypatch, bot):
+    """The channels to post to follow the renames and the archives."""
+    monkeypatch.setattr(bot, 'rtm', {'self': {'id': 'U0', 'name': 'bot'}})
+    bot.channels = {'test', 'dev'}
+    bot.directory.add({'id': 'C1', 'name': 'test'})
+    bot.resolve_channels()
+    assert 'C1' == bot.channel_id
+
+    for event in ({'type': 'channel_rename',
+                   'channel': {'id': 'C1', 'name': 'tests'}},
+                  {'type': 'channel_created',
+                   'channel': {'id': 'C2', 'name': 'dev'}},
+                  {'type': 'channel_archive', 'channel': 'C1'}):
+        yield from bot.on_message(event)
+
+    assert {'test': 'C1', 'dev': 'C2'} == bot.channel_ids
+
+    with patch.object(bot, 'call', new=CoroutineMock()) as call:
+        yield from bot.on_message({'type': 'message',
+                                   'channel': 'D1',
+                                   'user': 'U1',
+                                   'text': 'Lunch? :pizza:'})
+    assert not call.called, "The channel is archived."
+
+
+def test_bot_restore(monkeypatch, bot):
+    """The open polls of the previous run are scheduled again."""
+    now = 1000.0
+    monkeypatch.setattr('votebot.bot.time.time', lambda: now)
+    bot.rtm = {'team': {'id': 'T1'}}
+    bot.store = Mock()
+    bot.store.load.return_value = [
+        {'team': 'T1', 'channel': 'C1', 'ts': '1.0', 'title': 'Expired',
+         'text': '', 'deadline': now - 10},
+        {'team': 'T1', 'channel': 'C1', 'ts': '2.0', 'title': 'Open',
+         'text': '', 'deadline': now + 30},
+    ]
+
+    with patch.object(bot, 'timers') as timers:
+        bot.restore()
+
+    bot.store.load.assert_called_once_with('T1')
+    (expired, _, poll), _ = timers.schedule.call_args_list[0]
+    assert (0, '1.0') == (expired, poll.ts), "Closed right away."
+    (delay, *_), _ = timers.schedule.call_args_list[1]
+    assert 30 == delay
+    assert 2 == len(bot.polls)
+    assert all(poll.stale for poll in bot.polls)
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_seed_reactions(bot):
+    """The reactions are added in order, one at a time, without duplicates."""
+    in_flight = []
+
+    @asyncio.coroutine
+    def call(method, **kwargs):
+        assert not in_flight, "One reaction at a time."
+        in_flight.append(kwargs['name'])
+        yield from asyncio.sleep(0)
+        in_flight.pop()
+        return {'ok': kwargs['name'] != 'two', 'error': 'invalid_name'}
+
+    bot.polls.add(Poll('C1', '1.0', 'Title', 'Text', 0))
+    with patch.object(bot, 'call',
+                      new=CoroutineMock(side_effect=call)) as mock:
+        yield from bot.seed_reactions('C1', '1.0',
+                                      [':one:', ':two:', ':one:', ':three:'])
+
+    assert ['one', 'two', 'three'] == [c[1]['name']
+                                       for c in mock.call_args_list]
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_seed_closed_poll(bot):
+    """The seeding stops with the poll."""
+    bot.polls.add(Poll('C1', '1.0', 'Title', 'Text', 0))
+
+    @asyncio.coroutine
+    def call(method, **kwargs):
+        bot.polls.pop('C1', '1.0')
+        return {'ok': True}
+
+    with patch.object(bot, 'call',
+                      new=CoroutineMock(side_effect=call)) as mock:
+        yield from bot.seed_reactions('C1', '1.0', ['one', 'two', 'three'])
+
+    assert 1 == mock.call_count
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_single_choice(monkeypatch, bot):
+    """The users voting several times are left out, if asked to."""
+    bot.method = 'plurality'
+    bot.rtm = {'self': {'id': 'U0', 'name': 'bot'}}
+    bot.index_users([{'id': 'U1', 'name': 'john'},
+                     {'id': 'U2', 'name': 'frank'}])
+    poll = Poll('C1', '1.0', 'Title', 'Text', 0, ['a', 'b'])
+    poll.stale = True
+    reactions = [{'name': 'a', 'count': 3, 'users': ['U0', 'U1', 'U2']},
+                 {'name': 'b', 'count': 2, 'users': ['U0', 'U2']},
+                 {'name': 'c', 'count': 1, 'users': ['U1']}]
+
+    calls = []
+    with patch.object(bot, 'call', new=CoroutineMock(return_value={
+                'ok': True, 'message': {'reactions': reactions}})), \
+            patch.object(bot, 'call_nowait',
+                         side_effect=lambda *a, **kw: calls.append((a, kw))):
+        yield from bot.cast_votes(poll)
+
+    (method,), kwargs = calls[0]
+    assert [{'title': ':a: 1', 'value': 'john'},
+            {'title': ':b: 0', 'value': ''}] == \
+        kwargs['attachments'][0]['fields']
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_results_order(monkeypatch, bot):
+    """The options are ranked, counted the way the bot was asked to."""
+    monkeypatch.setattr(bot, 'rtm', {'self': {'id': 'U0', 'name': 'bot'}})
+    bot.index_users([{'id': 'U1', 'name': 'john'},
+                     {'id': 'U2', 'name': 'frank'}])
+    bot.method = 'weighted'
+    poll = Poll('C1', '1.0', 'Title', 'Text', 0, ['a', 'b'])
+    bot.polls.add(poll)
+
+    for event in (reaction('reaction_added', 'U0', 'a'),
+                  reaction('reaction_added', 'U0', 'b'),
+                  reaction('reaction_added', 'U1', 'a'),
+                  reaction('reaction_added', 'U1', 'b'),
+                  reaction('reaction_added', 'U2', 'b')):
+        yield from bot.on_message(event)
+
+    calls = []
+    with patch.object(bot, 'call_nowait',
+                      side_effect=lambda *a, **kw: calls.append((a, kw))):
+        yield from bot.cast_votes(poll)
+
+    (method,), kwargs = calls[0]
+    assert [{'title': ':b: 1.50', 'value': 'john, frank'},
+            {'title': ':a: 0.50', 'value': 'john'}] == \
+        kwargs['attachments'][0]['fields']
@@ -0,0 +1,51 @@
+from votebot.channels import ChannelDirectory
+
+
+def test_directory_rename():
+    directory = ChannelDirectory()
+    directory.update([{'id': 'C1', 'name': 'general'},
+                      {'id': 'G2', 'name': 'secret'}])
+
+    directory.rename('C1', 'town-square')
+
+    assert 2 == len(directory)
+    assert 'C1' == directory.id_for('town-square')
+    assert directory.id_for('general') is None
+    assert 'town-square' == directory.name_for('C1')
+
+
+def test_directory_archive():
+    directory = ChannelDirectory()
+    directory.add({'id': 'C1', 'name': 'old', 'is_archived': True})
+    assert 'C1' not in directory
+    assert directory.id_for('old') is None
+
+    directory.archive('C1', False)
+    assert 'C1' in directory
+    assert 'C1' == directory.id_for('old')
+
+
+def test_directory_name_reused():
+    """An archived channel doesn't hide the new one with its name."""
+    directory = ChannelDirectory()
+    directory.add({'id': 'C1', 'name': 'lunch'})
+    directory.add({'id': 'C2', 'name': 'lunch'})
+    directory.archive('C1')
+
+    assert 'C2' == directory.id_for('lunch')
+
+
+def test_directory_handle():
+    directory = ChannelDirectory()
+    events = ({'type': 'channel_created',
+               'channel': {'id': 'C1', 'name': 'general'}},
+              {'type': 'group_joined',
+               'channel': {'id': 'G2', 'name': 'secret'}},
+              {'type': 'group_left', 'channel': 'G2'},
+              {'type': 'channel_archive', 'channel': 'C1'})
+
+    assert all(map(directory.handle, events))
+    assert not directory.handle({'type': 'message', 'channel': 'C1'})
+    assert 'G2' not in directory
+    assert 'C1' not in directory
+    assert 1 == len(directory)
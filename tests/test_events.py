@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from votebot.events import BLOCK, DROP, DROP_OLDEST, EventFilter, EventQueue
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_queue_drop():
+    queue = EventQueue(1, policy=DROP)
+
+    assert (yield from queue.offer({'type': 'message', 'n': 1}))
+    assert not (yield from queue.offer({'type': 'message', 'n': 2}))
+
+    assert 1 == queue.get_nowait()['n']
+    assert {'message': 1} == queue.stats()['dropped']
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_queue_drop_oldest():
+    queue = EventQueue(1, policy=DROP_OLDEST)
+
+    yield from queue.offer({'type': 'message', 'n': 1})
+    yield from queue.offer({'type': 'message', 'n': 2})
+
+    assert 2 == queue.get_nowait()['n']
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_queue_block():
+    queue = EventQueue(1, policy=BLOCK, droppable=['user_typing'])
+
+    yield from queue.offer({'type': 'message', 'n': 1})
+    assert not (yield from queue.offer({'type': 'user_typing'}))
+
+    blocked = asyncio.ensure_future(queue.offer({'type': 'message', 'n': 2}))
+    yield from asyncio.sleep(0)
+    assert not blocked.done(), "Waiting for room."
+
+    assert 1 == queue.get_nowait()['n']
+    assert (yield from blocked)
+    assert {'depth': 1, 'maxsize': 1, 'high_water': 1,
+            'dropped': {'user_typing': 1}} == queue.stats()
+
+
+def test_queue_policy():
+    with pytest.raises(ValueError):
+        EventQueue(1, policy='maybe')
+
+
+def test_filter():
+    types = []
+    keep = EventFilter(['message', 'reaction_added'], on_drop=types.append)
+
+    assert keep('{"type": "reaction_added", "user": "U1", '
+                '"item": {"type": "message", "channel": "C1"}}')
+    assert not keep('{"type":"presence_change","presence":"away"}')
+    assert not keep('{"type":"message","channel":"C1",'
+                    '"text":"{\\"type\\":\\"reaction_added\\"}"}'), \
+        "Escaped quotes aren't keys."
+    assert not keep('{"ok":true,"reply_to":1}')
+
+    assert {'presence_change': 1, 'message': 1, None: 1} == keep.dropped
+    assert ['presence_change', 'message', None] == types
+
+
+def test_filter_bytes():
+    keep = EventFilter(['message'])
+
+    assert keep(b'{"type":"message","channel":"D1","text":"hi"}')
+    assert not keep(b'{"type":"message","channel":"C1","text":"hi"}')
+    assert not keep(b'{"type":"user_typing","channel":"D1"}')
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+import pytest
+
+import votebot
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='module __getattr__ needs Python 3.7')
+def test_lazy_import():
+    """Importing the package doesn't load aiohttp."""
+    code = ('import sys, votebot; '
+            'assert "aiohttp" not in sys.modules; '
+            'assert "votebot.bot" not in sys.modules')
+    subprocess.check_call([sys.executable, '-c', code])
+
+
+def test_lazy_names():
+    from votebot.utils import extract
+
+    assert extract is votebot.extract
+    assert 'Bot' in dir(votebot)
+    assert votebot.__version__
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from votebot.live import Debouncer
+from votebot.timers import Timers
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_debouncer_coalesce():
+    timers = Timers()
+    calls = []
+    debouncer = Debouncer(timers, calls.append, delay=0.01, rate=100)
+
+    for i in range(500):
+        debouncer.touch('a', 'first')
+        debouncer.touch('b', 'other')
+    assert 2 == len(debouncer)
+
+    yield from asyncio.sleep(0.03)
+    assert ['first', 'other'] == sorted(calls)
+    assert 'a' not in debouncer
+
+    debouncer.touch('a', 'again')
+    yield from asyncio.sleep(0.03)
+    timers.close()
+
+    assert 'again' == calls[-1]
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_debouncer_budget():
+    """The calls beyond the budget are postponed, not dropped."""
+    timers = Timers()
+    calls = []
+    debouncer = Debouncer(timers, calls.append, delay=0, rate=50, burst=1)
+
+    for key in 'abc':
+        debouncer.touch(key, key)
+    yield from asyncio.sleep(0.01)
+    assert 1 == len(calls)
+
+    yield from asyncio.sleep(0.06)
+    timers.close()
+    assert ['a', 'b', 'c'] == sorted(calls)
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_debouncer_cancel():
+    timers = Timers()
+    calls = []
+    debouncer = Debouncer(timers, calls.append, delay=0.01)
+
+    debouncer.touch('a', 'a')
+    debouncer.cancel('a')
+    debouncer.cancel('b')
+    yield from asyncio.sleep(0.02)
+    timers.close()
+
+    assert not calls
+    assert not len(timers)
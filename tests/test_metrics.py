@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from asynctest import Mock, patch
+from votebot.api import RateLimited, call
+from votebot.metrics import NullRegistry, Registry, serve
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    calls = registry.counter('calls_total', 'Calls.', ('method',))
+    depth = registry.gauge('depth', 'Depth.')
+
+    calls.labels('chat.postMessage').inc()
+    calls.labels('chat.postMessage').inc()
+    calls.labels('say "hi"').inc()
+    depth.set(3)
+
+    assert registry.render().splitlines() == [
+        '# HELP calls_total Calls.',
+        '# TYPE calls_total counter',
+        'calls_total{method="chat.postMessage"} 2',
+        'calls_total{method="say \\"hi\\""} 1',
+        '# HELP depth Depth.',
+        '# TYPE depth gauge',
+        'depth 3',
+    ]
+
+
+def test_histogram():
+    registry = Registry()
+    latency = registry.histogram('latency', 'Latency.', ('method',),
+                                 buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        latency.labels('api.test').observe(value)
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'latency_bucket{method="api.test",le="0.1"} 2',
+        'latency_bucket{method="api.test",le="1"} 3',
+        'latency_bucket{method="api.test",le="+Inf"} 4',
+        'latency_sum{method="api.test"} 2.65',
+        'latency_count{method="api.test"} 4',
+    ]
+
+
+def test_collectors():
+    registry = Registry()
+    polls = registry.gauge('polls', 'Polls.')
+    collector = Mock(side_effect=lambda: polls.set(42))
+    registry.register(collector)
+
+    assert 'polls 42' in registry.render()
+    registry.unregister(collector)
+    registry.render()
+    assert 1 == collector.call_count
+
+
+def test_null_registry():
+    registry = NullRegistry()
+    calls = registry.counter('calls_total', 'Calls.', ('method',))
+    calls.labels('api.test').inc()
+    registry.histogram('latency', 'Latency.').observe(1)
+    registry.register(Mock())
+
+    assert registry.render() == '\n'
+
+
+class RateLimitedSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    @asyncio.coroutine
+    def post(self, *args, **kwargs):
+        response = Mock(status=429, headers={'Retry-After': '3'})
+        response.release = asyncio.coroutine(lambda: None)
+        return response
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_api_metrics():
+    registry = Registry()
+    latency = registry.histogram('latency', 'Latency.', ('method',))
+    limited = registry.counter('limited', 'Limited.', ('method',))
+
+    with patch('votebot.api.ClientSession', new=RateLimitedSession), \
+            patch('votebot.api.API_LATENCY', new=latency), \
+            patch('votebot.api.API_RATE_LIMITED', new=limited):
+        with pytest.raises(RateLimited):
+            yield from call('chat.postMessage', token='xoxb-123')
+
+    assert 1 == limited.labels('chat.postMessage').value
+    assert 1 == latency.labels('chat.postMessage').count
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_serve():
+    """The metrics are served on localhost."""
+    import aiohttp
+
+    registry = Registry()
+    registry.counter('calls_total', 'Calls.').inc()
+    server, monitor = yield from serve(port=0, registry=registry)
+    host, port = server.sockets[0].getsockname()[:2]
+    try:
+        assert '127.0.0.1' == host
+        with aiohttp.ClientSession() as session:
+            response = yield from session.get(
+                'http://{0}:{1}/metrics'.format(host, port))
+            body = yield from response.text()
+            response.close()
+        assert 'calls_total 1' in body.splitlines()
+    finally:
+        monitor.cancel()
+        server.close()
@@ -0,0 +1,93 @@
+from votebot.poll import Poll, PollRegistry
+from votebot.results import Tally
+
+
+def test_votes():
+    poll = Poll('C1', '1.0', 'Lunch?', '', 0)
+
+    assert poll.vote('pizza', 1)
+    assert not poll.vote('pizza', 1), "Already voted."
+    assert poll.vote('sushi', 1)
+    assert poll.unvote('sushi', 1)
+    assert not poll.unvote('sushi', 1)
+    assert not poll.unvote('taco', 2)
+
+    assert {'pizza': 0b10} == poll.votes
+    assert 1 == poll.count('pizza')
+    assert 0 == poll.count('sushi')
+
+
+def test_multiple():
+    poll = Poll('C1', '1.0', 'Lunch?', '', 0)
+    for name, user in (('pizza', 0), ('pizza', 1), ('sushi', 1),
+                       ('taco', 1), ('taco', 2), ('sushi', 3)):
+        poll.vote(name, user)
+
+    assert 0b10 == poll.multiple()
+
+
+def test_load():
+    poll = Poll('C1', '1.0', 'Lunch?', '', 0)
+    poll.stale = True
+    poll.load([{'name': 'pizza', 'count': 2, 'users': ['U1', 'U2']},
+               {'name': 'sushi', 'count': 0, 'users': []}])
+
+    assert not poll.stale
+    assert ['pizza'] == list(poll.votes)
+    assert ['U1', 'U2'] == poll.users.ids(poll.voters('pizza'))
+
+
+def test_users():
+    """Each poll numbers its own voters."""
+    a = Poll('C1', '1.0', 'Lunch?', '', 0)
+    b = Poll('C1', '2.0', 'Dinner?', '', 0)
+    a.vote('pizza', a.users.number('U1'))
+    b.vote('pizza', b.users.number('U2'))
+
+    assert a.voters('pizza') == b.voters('pizza') == 1
+    assert ['U2'] == b.users.ids(b.voters('pizza'))
+
+
+def test_results():
+    """The tally follows the votes."""
+    poll = Poll('C1', '1.0', 'Lunch?', '', 0, ['pizza', 'sushi'])
+    poll.results = Tally(poll.options)
+    poll.vote('sushi', 1)
+    poll.vote('sushi', 1)
+    assert [(1, 'sushi'), (0, 'pizza')] == poll.results.ranking()
+
+    poll.unvote('sushi', 1)
+    poll.load([{'name': 'pizza', 'count': 1, 'users': ['U1']}])
+    assert [(1, 'pizza'), (0, 'sushi')] == poll.results.ranking()
+
+
+def test_interned_options():
+    a = Poll('C1', '1.0', 'Lunch?', '', 0, [''.join(['pi', 'zza'])])
+    b = Poll('C1', '2.0', 'Dinner?', '', 0, [''.join(['piz', 'za'])])
+
+    assert a.options[0] is b.options[0]
+
+
+def test_record():
+    record = {'team': 'T1', 'channel': 'C1', 'ts': '1.0',
+              'title': 'Lunch?', 'text': '', 'deadline': 10.0}
+    poll = Poll.from_record(record)
+
+    assert poll.stale, "The votes are to be fetched."
+    assert record == poll.record('T1')
+
+
+def test_registry():
+    polls = PollRegistry()
+    poll = Poll('C1', '1.0', 'Lunch?', '', 0)
+    polls.add(poll)
+
+    assert ('C1', '1.0') in polls
+    assert poll is polls.get('C1', '1.0')
+
+    polls.mark_stale()
+    assert poll.stale
+
+    assert poll is polls.pop('C1', '1.0')
+    assert polls.pop('C1', '1.0') is None
+    assert not len(polls)
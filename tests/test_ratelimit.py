@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from votebot.api import RateLimited
+from votebot.ratelimit import (PRIORITY_REACTIONS, PRIORITY_RESULTS, Scheduler,
+                               TokenBucket)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class MockClient:
+    def __init__(self, limited=()):
+        self.calls = []
+        self.limited = list(limited)
+
+    @asyncio.coroutine
+    def call(self, method, **kwargs):
+        self.calls.append((method, kwargs))
+        if method in self.limited:
+            self.limited.remove(method)
+            raise RateLimited(method, 429, 0.01)
+        return {'ok': True, 'method': method}
+
+
+def test_token_bucket():
+    clock = Clock()
+    bucket = TokenBucket(2, capacity=2, clock=clock)
+
+    assert bucket.take()
+    assert bucket.take()
+    assert not bucket.take(), "The burst is exhausted."
+    assert 0.5 == bucket.delay()
+
+    clock.now = 0.5
+    assert bucket.take()
+
+
+def test_token_bucket_slow():
+    """A bucket slower than a token per burst still holds one."""
+    bucket = TokenBucket(1 / 60, 5 / 60, clock=Clock())
+
+    assert 1 == bucket.capacity
+    assert bucket.take()
+    assert 60 == pytest.approx(bucket.delay())
+
+
+def test_token_bucket_pause():
+    clock = Clock()
+    bucket = TokenBucket(10, clock=clock)
+
+    bucket.pause(3)
+    clock.now = 2
+    assert 1 == bucket.delay(), "Retry-After wins over the refill."
+    clock.now = 3
+    assert bucket.take()
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_scheduler_priority():
+    client = MockClient()
+    scheduler = Scheduler(client, concurrency=1)
+
+    futures = [
+        scheduler.submit('reactions.add', priority=PRIORITY_REACTIONS),
+        scheduler.submit('chat.delete', priority=PRIORITY_RESULTS),
+    ]
+    yield from asyncio.wait(futures)
+    scheduler.close()
+
+    assert ['chat.delete', 'reactions.add'] == [m for m, _ in client.calls]
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_scheduler_retry_after():
+    client = MockClient(limited=['chat.delete'])
+    scheduler = Scheduler(client)
+
+    response = yield from scheduler.submit('chat.delete', ts='1')
+    scheduler.close()
+
+    assert response['ok']
+    assert 2 == len(client.calls), "The rate limited call is retried."
+    assert {'ts': '1'} == client.calls[1][1]
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_scheduler_tier_1():
+    """The tier 1 methods, e.g. rtm.connect, are sent right away."""
+    client = MockClient()
+    scheduler = Scheduler(client)
+
+    response = yield from asyncio.wait_for(
+        scheduler.submit('rtm.connect'), 1)
+    scheduler.close()
+
+    assert response['ok']
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_scheduler_cancelled():
+    """The cancelled calls are dropped without spending a token."""
+    client = MockClient()
+    scheduler = Scheduler(client, concurrency=1)
+
+    cancelled = scheduler.submit('reactions.add', name='one')
+    future = scheduler.submit('reactions.add', name='two')
+    cancelled.cancel()
+    yield from future
+    scheduler.close()
+
+    assert [{'name': 'two'}] == [kwargs for _, kwargs in client.calls]
+    bucket = scheduler.buckets[3]
+    assert bucket.capacity - 1 == pytest.approx(bucket.tokens, abs=0.1)
@@ -0,0 +1,96 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from votebot.results import Tally
+
+OPTIONS = ('pizza', 'sushi', 'taco')
+
+
+def vote(tally, *votes):
+    for name, user in votes:
+        tally.add(name, user)
+
+
+def test_approval():
+    tally = Tally(OPTIONS, ignore=0)
+    vote(tally, ('pizza', 0), ('sushi', 0), ('taco', 0),
+         ('taco', 1), ('sushi', 2), ('taco', 2), ('heart', 3))
+
+    assert [(2, 'taco'), (1, 'sushi'), (0, 'pizza')] == tally.ranking()
+    assert [(2, 'taco')] == tally.ranking(1)
+
+    tally.remove('taco', 1)
+    tally.remove('taco', 2)
+    assert [(1, 'sushi'), (0, 'pizza'), (0, 'taco')] == tally.ranking()
+
+
+def test_plurality():
+    tally = Tally(OPTIONS, 'plurality')
+    vote(tally, ('pizza', 1), ('sushi', 2), ('taco', 2), ('taco', 3))
+
+    assert [(1, 'pizza'), (1, 'taco'), (0, 'sushi')] == tally.ranking()
+
+    tally.remove('sushi', 2)
+    assert [(2, 'taco'), (1, 'pizza'), (0, 'sushi')] == tally.ranking()
+
+
+def test_weighted():
+    tally = Tally(OPTIONS, 'weighted')
+    vote(tally, ('pizza', 1), ('pizza', 2), ('sushi', 2),
+         ('taco', 2), ('taco', 3))
+
+    assert [(Fraction(4, 3), 'pizza'), (Fraction(4, 3), 'taco'),
+            (Fraction(1, 3), 'sushi')] == tally.ranking()
+    assert 3 == sum(score for score, _ in tally.ranking())
+
+
+def test_irv():
+    """The order of the reactions of a user is their ranking."""
+    tally = Tally(('a', 'b', 'c'), 'irv')
+    vote(tally,
+         ('a', 1), ('a', 2),
+         ('b', 3), ('b', 4),
+         ('c', 5), ('b', 5))
+
+    # c is eliminated, and its voter picks b.
+    assert [(3, 'b'), (2, 'a'), (1, 'c')] == tally.ranking()
+
+    tally.remove('b', 5)
+    assert [(2, 'a'), (2, 'b'), (1, 'c')] == tally.ranking()
+
+
+def test_duplicated_options():
+    tally = Tally(['taco', 'pizza', 'taco', 'sushi', 'pizza'])
+
+    assert ('taco', 'pizza', 'sushi') == tally.options
+    assert 3 == len(tally)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        Tally(OPTIONS, 'borda')
+
+
+@pytest.mark.parametrize('method', ['approval', 'plurality', 'weighted'])
+def test_incremental_ranking(method):
+    """The ranking kept with each vote is the one counted from scratch."""
+    rng = random.Random(42)
+    options = ['e{0}'.format(i) for i in range(30)]
+    tally = Tally(options, method)
+    votes = {}
+    for _ in range(2000):
+        name, user = rng.choice(options), rng.randrange(50)
+        bit = 1 << user
+        if votes.get(name, 0) & bit:
+            tally.remove(name, user)
+        else:
+            tally.add(name, user)
+        votes[name] = votes.get(name, 0) ^ bit
+
+    fresh = Tally(options, method)
+    fresh.reset(votes)
+    assert fresh.ranking() == tally.ranking()
+    scores = [score for score, _ in tally.ranking()]
+    assert sorted(scores, reverse=True) == scores
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from votebot.runtime import Runtime, load_config
+
+
+def test_load_config(tmpdir):
+    path = tmpdir.join('votebot.json')
+    path.write(json.dumps({'workspaces': [
+        {'token': 'xoxb-1', 'channel': 'general'},
+        {'token': 'xoxb-2', 'channels': ['dev', 'ops'], 'timeout': 300},
+    ]}))
+
+    workspaces = load_config(str(path))
+
+    assert 2 == len(workspaces)
+    assert ['dev', 'ops'] == workspaces[1]['channels']
+
+
+@pytest.mark.parametrize('workspace', [
+    {'channel': 'general'},
+    {'token': 'xoxb-1', 'chanel': 'general'},
+])
+def test_load_config_invalid(tmpdir, workspace):
+    path = tmpdir.join('votebot.json')
+    path.write(json.dumps({'workspaces': [workspace]}))
+
+    with pytest.raises(ValueError):
+        load_config(str(path))
+
+
+def test_runtime_shares(tmpdir):
+    runtime = Runtime()
+    first = runtime.add('xoxb-1', channel='general')
+    second = runtime.add('xoxb-2', channel='polls', channels=['dev'])
+
+    assert first.client is second.client
+    assert first.timers is second.timers
+    assert first.scheduler is not second.scheduler, "Per token rate limits."
+    assert {'polls', 'dev'} == second.channels
+
+    third = runtime.add('xoxb-3', channel='general')
+    assert 3 == len(runtime.stats()), "Same channel, other workspace."
+    assert first.log is not third.log
+
+    runtime.close()
+    assert first.future.done()
+    assert second.future.done()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from votebot.store import LogStore, SQLiteStore, open_store
+
+
+def poll(ts, team='T1', deadline=100.0):
+    return {'team': team,
+            'channel': 'C1',
+            'ts': ts,
+            'title': 'Lunch?',
+            'text': '',
+            'deadline': deadline}
+
+
+@pytest.fixture(params=['polls.sqlite3', 'polls.log'])
+def store(request, tmpdir):
+    store = open_store(str(tmpdir.join(request.param)))
+    yield store
+    store.close()
+
+
+def test_open_store(tmpdir):
+    assert open_store('') is None
+    assert isinstance(open_store(str(tmpdir.join('a.log'))), LogStore)
+    assert isinstance(open_store(str(tmpdir.join('a.db'))), SQLiteStore)
+
+
+def test_open_store_shared(tmpdir):
+    with pytest.raises(ValueError):
+        open_store(str(tmpdir.join('a.log')), shared=True)
+    assert isinstance(open_store(str(tmpdir.join('a.db')), shared=True),
+                      SQLiteStore)
+
+
+def test_store_batches(store):
+    store.add(poll('1.0', deadline=200))
+    store.add(poll('2.0'))
+    store.add(poll('3.0', team='T2'))
+    store.remove('T1', 'C1', '1.0')
+
+    assert 4 == len(store.pending), "Nothing is written yet."
+
+    records = store.load('T1')
+
+    assert [poll('2.0')] == records
+    assert not store.pending
+
+
+def test_store_reopen(store):
+    store.add(poll('1.0'))
+    store.close()
+
+    reopened = open_store(store.path)
+    assert [poll('1.0')] == reopened.load('T1')
+    reopened.close()
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_store_flush_later(tmpdir):
+    store = SQLiteStore(str(tmpdir.join('polls.sqlite3')), interval=0)
+    store.add(poll('1.0'))
+
+    yield from asyncio.sleep(0.01)
+    yield from store._writing
+
+    assert not store.pending
+    assert [poll('1.0')] == store._read()
+    store.close()
+
+
+def test_log_store_compaction(tmpdir):
+    path = tmpdir.join('polls.log')
+    store = LogStore(str(path))
+    store.add(poll('1.0'))
+    store.add(poll('2.0'))
+    store.remove('T1', 'C1', '1.0')
+    store.flush()
+    path.write('["add", {"broken', mode='a')
+
+    assert [poll('2.0')] == store.load('T1')
+    assert 1 == len(path.readlines()), "Only the open polls are kept."
@@ -0,0 +1,86 @@
+import logging
+import queue
+
+import pytest
+
+from votebot.supervisor import HashRing, LogListener, Supervisor, shard
+
+
+def test_hash_ring_stable():
+    """Adding a worker only moves the keys it takes over."""
+    keys = ['xoxb-{0}'.format(i) for i in range(1000)]
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+
+    moved = [k for k in keys if before.node_for(k) != after.node_for(k)]
+
+    assert all(4 == after.node_for(k) for k in moved)
+    assert len(moved) < 400
+
+
+def test_shard():
+    workspaces = [{'token': 'xoxb-{0}'.format(i)} for i in range(100)]
+
+    shards = shard(workspaces, 4)
+
+    assert 4 == len(shards)
+    assert 100 == sum(len(s) for s in shards)
+    assert all(shards), "Every worker gets some workspaces."
+
+
+def test_supervisor_numbers_the_workspaces():
+    workspaces = [{'token': 'xoxb-{0}'.format(i), 'channel': 'general'}
+                  for i in range(10)]
+
+    supervisor = Supervisor(workspaces, 3)
+
+    indexes = [w['index'] for s in supervisor.shards for w in s]
+    assert list(range(10)) == sorted(indexes)
+    assert 'index' not in workspaces[0]
+
+
+def test_supervisor_report(caplog):
+    supervisor = Supervisor([{'token': 'xoxb-1'}, {'token': 'xoxb-2'}], 2)
+    bot = {'queue': {'depth': 2}, 'open_polls': 1, 'pending_calls': 3}
+    supervisor.metrics = {0: {'<Bot(0#random)>': bot},
+                          1: {'<Bot(1#random)>': bot}}
+
+    with caplog.at_level(logging.INFO, logger='votebot.supervisor'):
+        supervisor.report(interval=0)
+        supervisor.report(interval=60)
+
+    # The garbage of other tests may be logged too.
+    records = [r for r in caplog.records if r.name == 'votebot.supervisor']
+    assert 1 == len(records), "Once per interval."
+    assert '2 bot(s): 4 queued event(s), 2 open poll(s), 6 pending call(s)' \
+        in records[0].getMessage()
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_log_listener():
+    """Each handler only gets the records of its level."""
+    logs = queue.Queue()
+    debug, error = ListHandler(logging.DEBUG), ListHandler(logging.ERROR)
+    listener = LogListener(logs, debug, error)
+    listener.start()
+    for level in (logging.INFO, logging.ERROR):
+        logs.put(logging.makeLogRecord({'levelno': level}))
+    listener.stop()
+
+    assert 2 == len(debug.records)
+    assert [logging.ERROR] == [r.levelno for r in error.records]
+
+
+def test_supervisor_store():
+    """The workers cannot share a log."""
+    with pytest.raises(ValueError):
+        Supervisor([{'token': 'xoxb-1'}], 2, store='votebot.log')
+    assert 'votebot.db' == Supervisor([], 2, store='votebot.db').store
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from votebot.api import Client, RateLimited
+from votebot.bot import Bot
+from votebot.testing import BOT_ID, FakeSlack
+
+
+def test_pagination():
+    slack = FakeSlack(users=5)
+
+    page = slack.api_users_list({'limit': '4'})
+    assert len(page['members']) == 4
+    cursor = page['response_metadata']['next_cursor']
+    assert cursor
+
+    page = slack.api_users_list({'limit': '4', 'cursor': cursor})
+    # The bot is part of the workspace.
+    assert [u['id'] for u in page['members']] == ['U00000004', BOT_ID]
+    assert page['response_metadata']['next_cursor'] == ''
+
+
+def test_poll_lifecycle():
+    slack = FakeSlack()
+    sent = []
+    slack.send = sent.append
+
+    posted = slack.api_chat_postMessage({'channel': 'C00000000',
+                                         'text': '<!here>',
+                                         'attachments': '[{"title": "?"}]'})
+    assert posted['ok']
+    assert slack.polls()[0]['attachments'] == [{'title': '?'}]
+
+    form = {'channel': 'C00000000', 'timestamp': posted['ts'],
+            'name': 'pizza'}
+    assert slack.api_reactions_add(form)['ok']
+    assert not slack.api_reactions_add(form)['ok']
+    assert slack.react('U00000001', 'C00000000', posted['ts'], 'pizza')
+    assert [e['type'] for e in sent] == ['reaction_added'] * 2
+
+    reactions = slack.api_reactions_get(form)['message']['reactions']
+    assert reactions == [{'name': 'pizza',
+                          'users': [BOT_ID, 'U00000001'],
+                          'count': 2}]
+
+    assert slack.react('U00000001', 'C00000000', posted['ts'], 'pizza',
+                       added=False)
+    assert sent[-1]['type'] == 'reaction_removed'
+
+    deleted = slack.api_chat_delete({'channel': 'C00000000',
+                                     'ts': posted['ts']})
+    assert deleted['ok']
+    assert not slack.polls()
+
+
+def test_dm():
+    slack = FakeSlack()
+    sent = []
+    slack.send = sent.append
+
+    slack.dm('U00000001', 'Lunch? :pizza:')
+    assert sent[0]['channel'].startswith('D')
+    assert sent[0]['user'] == 'U00000001'
+    assert sent[0]['text'] == 'Lunch? :pizza:'
+
+
+@asyncio.coroutine
+def until(condition, timeout=5):
+    """Wait for the condition to be met."""
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        yield from asyncio.sleep(0.01)
+    raise AssertionError('Timed out.')
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_rate_limited():
+    """The calls over the limits get a 429 and a Retry-After."""
+    # A call every 5s, without burst.
+    slack = FakeSlack(rate_limits={'api.test': 0.2})
+    yield from slack.start()
+    client = Client(base_url=slack.api_url)
+    try:
+        response = yield from client.call('api.test', token='xoxb-fake')
+        assert response['ok']
+        with pytest.raises(RateLimited) as excinfo:
+            yield from client.call('api.test', token='xoxb-fake')
+        assert 5 == excinfo.value.retry_after
+        assert 1 == slack.limited['api.test']
+    finally:
+        client.close()
+        yield from slack.close()
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_bot_end_to_end():
+    """A bot posts a poll, gets the votes and closes it."""
+    slack = FakeSlack(users=5)
+    yield from slack.start()
+    client = Client(base_url=slack.api_url)
+    bot = Bot('xoxb-fake', channel='general', timeout=0.5, client=client)
+    future = bot.connect()
+    try:
+        yield from asyncio.wait_for(slack.connected.wait(), 5)
+        slack.dm('U00000001', 'Lunch? :pizza: :sushi:')
+
+        # The poll is seeded with the reactions of the bot.
+        yield from until(lambda: slack.polls() and
+                         len(slack.polls()[0]['reactions']) == 2)
+        poll = slack.polls()[0]
+        assert 'Lunch?' == poll['attachments'][0]['title']
+        for user, name in (('U00000001', 'pizza'),
+                           ('U00000002', 'pizza'),
+                           ('U00000003', 'sushi')):
+            slack.react(user, poll['channel'], poll['ts'], name)
+
+        # The results replace the poll, only the author was fetched.
+        yield from until(lambda: slack.calls['chat.delete'])
+        (results,) = slack.polls()
+        assert [{'title': ':pizza: 2', 'value': 'user1, <@U00000002>'},
+                {'title': ':sushi: 1', 'value': '<@U00000003>'}] == \
+            results['attachments'][0]['fields']
+        assert 1 == slack.calls['users.info']
+    finally:
+        bot.future.set_result(None)
+        yield from future
+        # Let the listener close its connection.
+        yield from asyncio.sleep(0.1)
+        client.close()
+        yield from slack.close()
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from votebot.timers import Timers
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_timers_order():
+    timers = Timers()
+    fired = []
+
+    timers.schedule(0.02, fired.append, 'second')
+    timers.schedule(0.01, fired.append, 'first')
+    assert 2 == len(timers)
+
+    yield from asyncio.sleep(0.05)
+    timers.close()
+
+    assert ['first', 'second'] == fired
+    assert 0 == len(timers)
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_timers_cancel_and_reschedule():
+    timers = Timers()
+    fired = []
+
+    cancelled = timers.schedule(0.01, fired.append, 'cancelled')
+    moved = timers.schedule(0.01, fired.append, 'moved')
+    timers.schedule(0.02, fired.append, 'kept')
+
+    timers.cancel(cancelled)
+    timers.reschedule(moved, 0.03)
+    assert 2 == len(timers)
+
+    yield from asyncio.sleep(0.05)
+    timers.close()
+
+    assert ['kept', 'moved'] == fired
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_timers_coroutine():
+    timers = Timers()
+    done = asyncio.Future()
+
+    @asyncio.coroutine
+    def callback(value):
+        done.set_result(value)
+
+    timers.schedule(0, callback, 42)
+
+    assert 42 == (yield from asyncio.wait_for(done, 1))
+    timers.close()
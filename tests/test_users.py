@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from asynctest import CoroutineMock
+from votebot.users import UserCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru():
+    cache = UserCache(None, size=2)
+    cache.update([{'id': 'U1', 'name': 'john'},
+                  {'id': 'U2', 'name': 'frank'}])
+    assert 'john' == cache.get('U1')
+
+    cache.put('U3', 'jane')
+    assert 2 == len(cache)
+    assert 'U1' in cache, "Recently used."
+    assert 'U2' not in cache, "Least recently used."
+
+
+def test_ttl():
+    clock = Clock()
+    cache = UserCache(None, ttl=10, clock=clock)
+    cache.put('U1', 'john')
+
+    clock.now = 9
+    assert 'john' == cache.get('U1')
+    clock.now = 10
+    assert cache.get('U1') is None
+    assert 0 == len(cache)
+
+
+@pytest.mark.asyncio
+@asyncio.coroutine
+def test_coalescing():
+    @asyncio.coroutine
+    def fetch(id_):
+        yield from asyncio.sleep(0)
+        if id_ == 'U2':
+            raise ValueError('Boom')
+        return {'id': id_, 'name': 'john'}
+
+    fetch = CoroutineMock(side_effect=fetch)
+    cache = UserCache(fetch)
+
+    names = yield from asyncio.gather(cache.resolve('U1'),
+                                      cache.resolve('U1'),
+                                      cache.resolve('U2'))
+    assert ['john', 'john', None] == names
+    assert 2 == fetch.call_count, "One call per user."
+
+    assert 'john' == (yield from cache.resolve('U1'))
+    assert 2 == fetch.call_count, "Cached."
+    assert 'U2' not in cache, "Failures are not cached."
@@ -1,6 +1,9 @@
 """Tricky use cases for the extract function."""
 
-from votebot.utils import extract
+import random
+import re
+
+from votebot.utils import extract, extract_channel
 
 
 def test_preserve_users():
@@ -13,3 +16,42 @@ def test_preserve_skin_tone():
     query, emojis = extract('? :nose::skin-tone-1::nose:')
     assert '?' == query
     assert [':nose::skin-tone-1:', ':nose:'] == emojis
+
+
+def reference_extract(message):
+    """Former implementation of extract, based on a placeholder."""
+    message = re.sub(r'::skin-tone-', '§§skin-tone-', message)
+    match = re.search(r':[:a-zA-Z0-9+\-_, §]+$', message)
+    if not match:
+        return message, [':+1:', ':heart:']
+
+    query = message[0:match.span()[0]].strip()
+    emojis = re.split('[, ]',
+                      match.group(0)
+                           .replace('::', ': :')
+                           .replace('§§skin-tone', '::skin-tone'))
+    return query, emojis
+
+
+FRAGMENTS = ('a', 'Z', '1', '+', '-', '_', ',', ' ', ' ', ':', ':', '::',
+             '?', '\n', '\t', 'é', '<@U1>', 'skin-tone-', '::skin-tone-2:',
+             ':+1:', ':heart:', ':nose:')
+
+
+def test_same_as_reference():
+    """Property test against the former implementation."""
+    rand = random.Random(42)
+    for _ in range(50000):
+        message = ''.join(rand.choice(FRAGMENTS)
+                          for _ in range(rand.randint(0, 12)))
+        query, emojis = reference_extract(message)
+        # The former placeholder leaked into the question.
+        query = query.replace('§§skin-tone-', '::skin-tone-')
+
+        assert (query, emojis) == extract(message), message
+
+
+def test_extract_channel():
+    channel, message = extract_channel('  <#G1> Lunch? :pizza:')
+    assert 'G1' == channel
+    assert 'Lunch? :pizza:' == message
@@ -2,13 +2,47 @@
 Votebot module.
 
 See ``__main__.py`` for more details on how to use it.
+
+From Python 3.7, the submodules are loaded on first use, so that importing
+the package, or running ``python -m votebot`` without a token, doesn't load
+aiohttp. Older Pythons import them eagerly. The version is a plain string,
+the packaging metadata is never read.
 """
 
-import pkg_resources
+import importlib
+import sys
+
+from ._version import __version__  # noqa
+
+__all__ = ('Bot', 'call', 'extract')
+
+_LAZY = {
+    'Bot': 'bot',
+    'call': 'api',
+    'extract': 'utils',
+}
+"""Module of the public names, imported on first access."""
+
+
+def __getattr__(name):
+    """Import the public names on first access (PEP 562)."""
+    if name in _LAZY:
+        module = importlib.import_module('.' + _LAZY[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError('module {0!r} has no attribute {1!r}'
+                             .format(__name__, name))
+    globals()[name] = value
+    return value
+
 
+def __dir__():
+    """List the public names, imported or not."""
+    return sorted(set(globals()).union(__all__))
 
-__version__ = pkg_resources.get_distribution('slack-votebot').version
 
-from .api import call  # noqa
-from .bot import Bot  # noqa
-from .utils import extract  # noqa
+if sys.version_info < (3, 7):
+    # Module level __getattr__ isn't supported.
+    from .api import call  # noqa
+    from .bot import Bot  # noqa
+    from .utils import extract  # noqa
@@ -1,33 +1,58 @@
 """Default bot."""
-import asyncio
 import logging
 import os
 import sys
 
-from .bot import Bot
-from .config import SLACK_CHANNEL, SLACK_TOKEN, VOTE_TIMEOUT
+from .config import (METRICS_PORT, POLL_STORE, SLACK_CHANNEL, SLACK_TOKEN,
+                     VOTE_TIMEOUT, VOTEBOT_CONFIG, VOTEBOT_WORKERS)
 
 
 def main(argv):
     """Le bot."""
-    if not SLACK_TOKEN:
-        print("Please configure a SLACK_TOKEN.",
+    # Imported once needed, failing fast on a missing configuration.
+    if VOTEBOT_CONFIG:
+        from .runtime import load_config
+        workspaces = load_config(VOTEBOT_CONFIG)
+    elif SLACK_TOKEN:
+        workspaces = [{'token': SLACK_TOKEN,
+                       'channel': SLACK_CHANNEL,
+                       'timeout': VOTE_TIMEOUT}]
+    else:
+        print("Please configure a SLACK_TOKEN or a VOTEBOT_CONFIG.",
               file=sys.stderr)
         return 1
 
-    bot = Bot(SLACK_TOKEN, channel=SLACK_CHANNEL, timeout=VOTE_TIMEOUT)
-
     if os.environ.get('DEBUG'):
         logging.basicConfig(level=logging.DEBUG)
     else:
         logging.basicConfig(level=logging.INFO)
 
     logger = logging.getLogger(__name__)
-    logger.info("Starting the votebot on #%s, default timeout %d.",
-                SLACK_CHANNEL,
-                VOTE_TIMEOUT)
+
+    if VOTEBOT_WORKERS:
+        from .supervisor import Supervisor
+        logger.info("Starting %d workers for %d workspaces.",
+                    VOTEBOT_WORKERS,
+                    len(workspaces))
+        Supervisor(workspaces, VOTEBOT_WORKERS).run()
+        return 0
+
+    import asyncio
+
+    from .runtime import Runtime
+    from .store import open_store
+
+    runtime = Runtime(store=open_store(POLL_STORE),
+                      metrics_port=METRICS_PORT)
+    for workspace in workspaces:
+        runtime.add(**workspace)
+
+    for bot in runtime.bots:
+        logger.info("Starting the votebot on #%s, default timeout %d.",
+                    bot.channel,
+                    bot.timeout)
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(bot.connect())
+    loop.run_until_complete(runtime.run())
     loop.close()
 
 
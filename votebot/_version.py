@@ -0,0 +1,3 @@
+"""Version of the package, also read by setup.py without importing it."""
+
+__version__ = '0.0.1b2.dev20160608'
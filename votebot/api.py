@@ -31,7 +31,7 @@ Using the `files.upload`_ API call requires the content to be sent using
 
 .. code-block:: python
 
-    with open('myfile.png') as f:
+    with open('myfile.png', 'rb') as f:
         await call('files.upload',
                    title='Super picture',
                    filename='myfile.png',
@@ -40,29 +40,105 @@ Using the `files.upload`_ API call requires the content to be sent using
 
 Or send the raw content via ``content``.
 
+The file is streamed by chunks, so the memory stays flat whatever its size.
+It may also be given as a path, a buffer (``bytes``, ``memoryview``) or an
+asynchronous iterator of bytes, the latter being spooled to a temporary file
+first as its size is unknown. ``progress`` is called with the bytes sent so
+far and the total, when known.
+
+.. code-block:: python
+
+    await call('files.upload',
+               filename='results.csv',
+               file='/tmp/results.csv',
+               progress=lambda sent, total: print(sent, '/', total))
+
+
+Connection pooling
+------------------
+
+:py:func:`call` opens a new HTTP session, hence a new TCP and TLS handshake,
+for every request. Long running programs should keep a :py:class:`Client`
+around instead, it reuses its connections between the calls.
+
+.. code-block:: python
+
+    client = Client()
+    try:
+        response = await client.call('api.test', token=token)
+    finally:
+        client.close()
+
 .. _Slack Web API: https://api.slack.com/web/
 .. _files.upload: https://api.slack.com/methods/files.upload
 
 """
 
 import asyncio
-import json
+import io
 import logging
+import os
+import tempfile
+import time
 
-from aiohttp import ClientSession, FormData, Timeout
+from aiohttp import ClientSession, FormData, TCPConnector, Timeout
 
-from .config import SLACK_DOMAIN
+from .codec import dumps, loads
+from .config import (HTTP_KEEPALIVE_TIMEOUT, HTTP_LIMIT, SLACK_API_URL,
+                     UPLOAD_TIMEOUT)
+from .metrics import API_ERRORS, API_LATENCY, API_RATE_LIMITED
 
 LOG = logging.getLogger(__name__)
 
+SPOOL_MAX_SIZE = 1024 * 1024
+"""Bytes of an asynchronous upload kept in memory before using the disk."""
+
+
+class ApiError(Exception):
+    """
+    Unexpected HTTP status from the Slack Web API.
+
+    :param method: name of the API method
+    :type method: str
+    :param status: HTTP status code
+    :type status: int
+    """
+
+    def __init__(self, method, status):
+        """Initialize the error."""
+        super().__init__(method, status)
+        self.method = method
+        self.status = status
+
+    def __str__(self):
+        """String representation."""
+        return '/api/{0} responded with HTTP {1}'.format(self.method,
+                                                         self.status)
+
+
+class RateLimited(ApiError):
+    """
+    The API call was rate limited (HTTP 429).
+
+    :param retry_after: seconds to wait before calling the method again
+    :type retry_after: float
+    """
+
+    def __init__(self, method, status, retry_after):
+        """Initialize the error."""
+        super().__init__(method, status)
+        self.retry_after = retry_after
+
 
 @asyncio.coroutine
-def call(method, file=None, **kwargs):
+def call(method, file=None, progress=None, **kwargs):
     r"""
     Perform an API call to Slack.
 
-    :param file: File pointer
+    :param file: binary file object, path, buffer or asynchronous iterator
     :type file: file
+    :param progress: called with the bytes uploaded so far and the total
+    :type progress: callable
     :param \**kwargs: see below
 
     :Keyword Arguments:
@@ -70,31 +146,213 @@ def call(method, file=None, **kwargs):
 
     :returns: JSON response.
     :rtype: dict
+    :raises ApiError: on a non-200 HTTP response
+    :raises RateLimited: on a 429 HTTP response
+    """
+    with ClientSession() as session:
+        return (yield from _post(session, SLACK_API_URL, method, file,
+                                 progress, kwargs))
+
+
+class Client:
+    """
+    Pooled HTTP client for the Slack Web API.
+
+    It owns a single session whose connections are kept alive and shared by
+    all the calls, the DNS resolutions are cached as well.
+
+    :param limit: maximum number of simultaneous connections, the calls all
+                  go to the same host
+    :type limit: int
+    :param keepalive_timeout: seconds before closing an idle connection
+    :type keepalive_timeout: float
+    :param base_url: URL of the Web API
+    :type base_url: str
     """
+
+    def __init__(self, *, limit=None, keepalive_timeout=None,
+                 base_url=None):
+        """Initialize the client, the session is created on first use."""
+        self.base_url = base_url or SLACK_API_URL
+        self.limit = limit or HTTP_LIMIT
+        self.keepalive_timeout = keepalive_timeout or HTTP_KEEPALIVE_TIMEOUT
+        self._session = None
+
+    @property
+    def session(self):
+        """Lazily created HTTP session."""
+        if self._session is None:
+            # aiohttp 1.x has no limit_per_host.
+            connector = TCPConnector(limit=self.limit,
+                                     keepalive_timeout=self.keepalive_timeout,
+                                     use_dns_cache=True)
+            self._session = ClientSession(connector=connector)
+        return self._session
+
+    @property
+    def closed(self):
+        """Whether the client has been closed."""
+        return self._session is not None and self._session.closed
+
+    @asyncio.coroutine
+    def call(self, method, file=None, progress=None, **kwargs):
+        r"""
+        Perform an API call to Slack using the pooled session.
+
+        See :py:func:`call` for the arguments.
+        """
+        return (yield from _post(self.session, self.base_url, method, file,
+                                 progress, kwargs))
+
+    def close(self):
+        """Close the session and all its connections."""
+        if self._session is not None and not self._session.closed:
+            self._session.close()
+
+
+class _Buffer:
+    """Reader of a buffer, copying one chunk at a time."""
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer).cast('B')
+        self.position = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size < 0 else self.position + size
+        chunk = bytes(self.view[self.position:end])
+        self.position += len(chunk)
+        return chunk
+
+    def close(self):
+        self.view.release()
+
+
+class _Upload(io.RawIOBase):
+    """
+    Stream of the file to upload, read by chunks by aiohttp.
+
+    :param raw: object to read the bytes, or text, from
+    :param size: number of bytes to send, if known
+    :param progress: called with the bytes sent so far and the size
+    :param owned: whether to close the raw object along with the upload
+    """
+
+    def __init__(self, raw, size=None, progress=None, owned=False):
+        super().__init__()
+        self.raw = raw
+        self.size = size
+        self.progress = progress
+        self.owned = owned
+        self.sent = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if isinstance(chunk, str):
+            # Files opened in text mode.
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            self.sent += len(chunk)
+            if self.progress is not None:
+                self.progress(self.sent, self.size)
+        return chunk
+
+    def close(self):
+        if self.owned and not self.closed:
+            self.raw.close()
+        super().close()
+
+
+@asyncio.coroutine
+def _upload(file, progress):
+    """Wrap the file to upload into a stream."""
+    if isinstance(file, str) or hasattr(file, '__fspath__'):
+        path = os.fspath(file) if hasattr(file, '__fspath__') else file
+        return _Upload(open(path, 'rb'), os.path.getsize(path), progress,
+                       owned=True), os.path.basename(path)
+
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        buffer = _Buffer(file)
+        return _Upload(buffer, len(buffer.view), progress, owned=True), None
+
+    if hasattr(file, '__aiter__'):
+        iterator = file.__aiter__()
+        if asyncio.iscoroutine(iterator):  # Python 3.5.0 and 3.5.1
+            iterator = yield from iterator
+        spool = tempfile.SpooledTemporaryFile(SPOOL_MAX_SIZE)
+        try:
+            while True:
+                try:
+                    chunk = yield from iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                spool.write(chunk)
+            size = spool.tell()
+            spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+        return _Upload(spool, size, progress, owned=True), None
+
+    size = None
+    try:
+        size = os.fstat(file.fileno()).st_size - file.tell()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    name = getattr(file, 'name', None)
+    filename = os.path.basename(name) if isinstance(name, str) else None
+    return _Upload(file, size, progress), filename
+
+
+@asyncio.coroutine
+def _post(session, base_url, method, file, progress, kwargs):
+    """POST the form to the given method using the session."""
     # JSON encode any sub-structure...
     for k, w in kwargs.items():
         # keep str as is.
         if not isinstance(w, (bytes, str)):
-            kwargs[k] = json.dumps(w)
+            kwargs[k] = dumps(w)
 
     form = FormData(kwargs)
 
-    # Handle file upload
-    if file:
-        form.add_field('file', file)
+    # Handle file upload, streamed by aiohttp.
+    upload = None
+    if file is not None:
+        upload, filename = yield from _upload(file, progress)
+        form.add_field('file', upload,
+                       filename=kwargs.get('filename') or filename or 'file',
+                       content_type='application/octet-stream')
 
-    logging.debug('POST (m=%s) /api/%s %s', form.is_multipart, method, kwargs)
+    # The arguments and the responses may be large, only log them when
+    # someone is listening.
+    debug = LOG.isEnabledFor(logging.DEBUG)
+    if debug:
+        LOG.debug('POST (m=%s) /api/%s %s', form.is_multipart, method, kwargs)
 
-    with ClientSession() as session:
-        with Timeout(10):
-            response = yield from session.post('https://{0}/api/{1}'
-                                               .format(SLACK_DOMAIN, method),
-                                               data=form)
-            assert 200 == response.status, response
+    start = time.monotonic()
+    try:
+        # Uploads of large files take their time, within limits.
+        with Timeout(UPLOAD_TIMEOUT if upload is not None else 10):
+            response = yield from session.post(base_url + method, data=form)
             try:
-                body = yield from response.json()
-                logging.debug('Response /api/%s %d %s',
+                if 429 == response.status:
+                    API_RATE_LIMITED.labels(method).inc()
+                    retry_after = response.headers.get('Retry-After', 1)
+                    raise RateLimited(method, response.status,
+                                      float(retry_after))
+                if 200 != response.status:
+                    API_ERRORS.labels(method).inc()
+                    raise ApiError(method, response.status)
+                body = yield from response.json(loads=loads)
+                if debug:
+                    LOG.debug('Response /api/%s %d %s',
                               method, response.status, body)
                 return body
             finally:
                 yield from response.release()
+                API_LATENCY.labels(method).observe(time.monotonic() - start)
+    finally:
+        if upload is not None:
+            upload.close()
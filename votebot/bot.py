@@ -1,33 +1,136 @@
 """Slack bot."""
 
 import asyncio
-import json
+import itertools
 import logging
+import random
+import time
 
 from aiohttp import ClientSession, MsgType
 
-from .api import call
-from .utils import extract
+from .api import Client
+from .channels import ChannelDirectory
+from .codec import dumps, loads
+from .config import (CONSUMERS, LIVE_RESULTS, QUEUE_DROPPABLE, QUEUE_POLICY,
+                     QUEUE_SIZE, RECONNECT_BASE, RECONNECT_MAX,
+                     RTM_PING_INTERVAL, VOTE_METHOD)
+from .events import EventFilter, EventQueue
+from .live import Debouncer
+from .metrics import (OPEN_POLLS, PENDING_CALLS, POLL_READY, QUEUE_DEPTH,
+                      REGISTRY, RTM_DROPPED, RTM_EVENTS)
+from .poll import Poll, PollRegistry
+from .ratelimit import (PRIORITY_LIVE, PRIORITY_NORMAL, PRIORITY_POLL,
+                        PRIORITY_REACTIONS, PRIORITY_RESULTS, Scheduler)
+from .results import METHODS, Tally, display
+from .timers import Timers
+from .users import UserCache
+from .utils import extract, extract_channel
+
+
+def backoff(attempt, base=None, maximum=None):
+    """
+    Jittered exponential delay before the next reconnection attempt.
+
+    :param attempt: number of failed attempts so far
+    :type attempt: int
+    :rtype: float
+
+    >>> 0 <= backoff(3, base=1, maximum=60) <= 8
+    True
+    """
+    base = RECONNECT_BASE if base is None else base
+    maximum = RECONNECT_MAX if maximum is None else maximum
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
 
 
 class Bot:
     """Slack bot for voting."""
 
-    def __init__(self, token, *, channel=None, timeout=None):
-        """Initialize the bot with a token."""
+    EVENTS = ('hello', 'goodbye', 'message', 'reaction_added',
+              'reaction_removed', 'team_join',
+              'user_change') + ChannelDirectory.EVENTS
+    """RTM events handled by the bot, the others are never decoded."""
+
+    def __init__(self, token, *, channel=None, channels=None, timeout=None,
+                 client=None, timers=None, store=None, live=None,
+                 method=None, index=None):
+        """
+        Initialize the bot with a token.
+
+        :param channel: name of the default channel to post the polls to
+        :type channel: str
+        :param channels: names of other channels where a poll may be posted
+                         by mentioning the channel at the start of the DM
+        :type channels: list
+        :param client: HTTP client, shared with other bots
+        :type client: :py:class:`votebot.api.Client`
+        :param timers: poll expiry timers, shared with other bots
+        :type timers: :py:class:`votebot.timers.Timers`
+        :param store: persistence of the open polls
+        :type store: :py:class:`votebot.store.Store`
+        :param live: whether the polls show the votes as they come, see
+                     :py:mod:`votebot.live`
+        :type live: bool
+        :param method: how the votes are counted, see
+                       :py:mod:`votebot.results`
+        :type method: str
+        :param index: number of the workspace, telling apart the bots which
+                      post to channels of the same name
+        :type index: int
+        """
         self.__token = token
         self.channel = channel or 'random'
+        self.index = index
         self.channel_id = None
+        self.channels = {self.channel}.union(channels or ())
+        # Ids of the channels to post to, by configured name. The ids stay
+        # the same when the channels are renamed.
+        self.channel_ids = {}
+        # All the channels of the workspace.
+        self.directory = ChannelDirectory()
         self.name = 'votebot'
         self.timeout = timeout or 60
+        self.method = method or VOTE_METHOD
+        if self.method not in METHODS:
+            raise ValueError('Unknown voting method: {0!r}.'
+                             .format(self.method))
+        self.client = client or Client()
+        self.scheduler = Scheduler(self.client)
         self.future = asyncio.Future()
-        self.queue = asyncio.Queue()
+        self.future.add_done_callback(lambda f: self.scheduler.close())
+        self.timers = Timers() if timers is None else timers
+        self.store = store
+        if timers is None:
+            self.future.add_done_callback(lambda f: self.timers.close())
+        if client is None:
+            # The bot owns its client and closes it along with itself.
+            self.future.add_done_callback(lambda f: self.client.close())
+        self.queue = EventQueue(QUEUE_SIZE,
+                                policy=QUEUE_POLICY,
+                                droppable=QUEUE_DROPPABLE)
+        self.consumers = CONSUMERS
+        self.events = EventFilter(self.EVENTS, on_drop=self._dropped)
         self.log = logging.getLogger(str(self))
         self.rtm = None
+        self.ws = None
+        self._ids = itertools.count(1)
+        # Names of the recently seen users.
+        self.users = UserCache(self._fetch_user)
+        # The open polls, by message.
+        self.polls = PollRegistry()
+        # Seeding of the open polls, by message.
+        self.seeding = {}
+        # Updates of the open polls.
+        self.live = None
+        if LIVE_RESULTS if live is None else live:
+            self.live = Debouncer(self.timers, self.show_results)
+            self.future.add_done_callback(lambda f: self.live.close())
 
     def __str__(self):
         """String representation."""
-        return '<Bot(#{0})>'.format(self.channel)
+        if self.index is None:
+            return '<Bot(#{0})>'.format(self.channel)
+        return '<Bot({0}#{1})>'.format(self.index, self.channel)
 
     def connect(self):
         """
@@ -36,68 +139,286 @@ class Bot:
         :returns: a future for when the bot wants to be closed.
         :rtype: :py:class:`asyncio.Future`
         """
-        asyncio.ensure_future(self._run())
+        task = asyncio.ensure_future(self._run())
+        task.add_done_callback(self._started)
+        self.future.add_done_callback(lambda f: task.cancel())
+        REGISTRY.register(self.collect)
+        self.future.add_done_callback(
+            lambda f: REGISTRY.unregister(self.collect))
         return self.future
 
     @asyncio.coroutine
-    def call(self, method, file=None, **kwargs):
-        """Wrap the api.call with the token."""
-        return (yield from call(method,
-                                file=file,
-                                token=self.__token,
-                                **kwargs))
+    def call(self, method, file=None, priority=PRIORITY_NORMAL, **kwargs):
+        """Wrap the api.call with the token, honoring the rate limits."""
+        return (yield from self.scheduler.submit(method,
+                                                 priority=priority,
+                                                 file=file,
+                                                 token=self.__token,
+                                                 **kwargs))
+
+    def call_nowait(self, method, priority=PRIORITY_NORMAL, **kwargs):
+        """
+        Schedule an API call without waiting for its response.
+
+        :returns: the future response, any failure is logged.
+        :rtype: :py:class:`asyncio.Future`
+        """
+        future = self.scheduler.submit(method,
+                                       priority=priority,
+                                       token=self.__token,
+                                       **kwargs)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _log_failure(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.log.error('API call failed: %s', future.exception())
+
+    @asyncio.coroutine
+    def paginate(self, method, key, callback, **kwargs):
+        r"""
+        Walk through the pages of a cursor-paginated method.
+
+        :param method: name of the method
+        :type method: str
+        :param key: the list of items in the response
+        :type key: str
+        :param callback: called with each list of items, a truthy return
+                         value stops the pagination
+        :param \**kwargs: arguments of the method
+        """
+        kwargs.setdefault('limit', 200)
+        while True:
+            response = yield from self.call(method, **kwargs)
+            if not response['ok']:
+                raise ValueError(response['error'])
+            if callback(response[key]):
+                return
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                return
+            kwargs['cursor'] = cursor
+
+    def _started(self, task):
+        """Stop the bot when it couldn't start, the error is its result."""
+        if task.cancelled() or self.future.done():
+            return
+        if task.exception() is not None:
+            self.future.set_result(task.exception())
 
     @asyncio.coroutine
     def _run(self):
         """Run the bot by connecting to the Real-Time Messages API."""
-        self.rtm = yield from self.call('rtm.start')
-
-        if not self.rtm['ok']:
-            self.future.set_result(ValueError(self.rtm['error']))
-
-        # Searching both into channels and private channels (groups)
-        for c in self.rtm['channels']:
-            if c['name'] == self.channel:
-                self.channel_id = c['id']
+        # rtm.connect only returns the URL, the bot and the team, and the
+        # users are fetched when needed, which keeps the memory independent
+        # from the size of the workspace.
+        attempt = 0
+        while True:
+            try:
+                rtm = yield from self.call('rtm.connect')
                 break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Retried like the reconnections, the network may be flaky.
+                delay = backoff(attempt)
+                attempt += 1
+                self.log.warning('rtm.connect failed: %s, retrying in %.1fs.',
+                                 e, delay)
+                yield from asyncio.sleep(delay)
+        if not rtm['ok']:
+            self.future.set_result(ValueError(rtm['error']))
+            return
 
-        for g in self.rtm['groups']:
-            if g['name'] == self.channel:
-                self.channel_id = g['id']
-                break
+        self.rtm = {'url': rtm['url'],
+                    'self': {'id': rtm['self']['id'],
+                             'name': rtm['self']['name']},
+                    'team': {'id': rtm['team']['id'],
+                             'domain': rtm['team']['domain']}}
+
+        # Both the channels and the private channels (groups)
+        yield from self.paginate('conversations.list', 'channels',
+                                 self.directory.update,
+                                 exclude_archived=True,
+                                 types='public_channel,private_channel')
+        self.resolve_channels()
+        for name in self.channels.difference(self.channel_ids):
+            self.log.error('#%s was not found.', name)
+
+        self.restore()
+
+        tasks = [asyncio.ensure_future(self._consume())
+                 for _ in range(self.consumers)]
+        tasks.append(asyncio.ensure_future(self._listen()))
+        self.future.add_done_callback(
+            lambda f: [task.cancel() for task in tasks])
+
+    def resolve_channels(self):
+        """Find the ids of the channels to post to, the missing ones."""
+        for name in self.channels.difference(self.channel_ids):
+            id_ = self.directory.id_for(name)
+            if id_ is not None:
+                self.log.info('#%s is %s.', name, id_)
+                self.channel_ids[name] = id_
+        self.channel_id = self.channel_ids.get(self.channel)
+
+    def restore(self):
+        """Schedule again the polls left open by a previous run."""
+        if self.store is None:
+            return
 
-        asyncio.ensure_future(self._consume())
-        asyncio.ensure_future(self._listen())
+        now = time.time()
+        for record in self.store.load(self.rtm['team']['id']):
+            # The reactions are fetched when closing the poll.
+            poll = Poll.from_record(record)
+            self.polls.add(poll)
+            delay = max(0, poll.deadline - now)
+            self.log.info('Restore %s, closing in %ds.', poll.title, delay)
+            poll.timer = self.timers.schedule(delay, self.cast_votes, poll)
 
     @asyncio.coroutine
     def _listen(self):
-        """Listen to the WebSocket URL."""
+        """Listen to the WebSocket URL, reconnecting when it goes away."""
+        url = self.rtm['url']
+        attempt = 0
+        while not self.future.done():
+            if url is None:
+                try:
+                    rtm = yield from self.call('rtm.connect')
+                    if rtm['ok']:
+                        url = rtm['url']
+                    else:
+                        self.log.error('rtm.connect failed: %s', rtm['error'])
+                except asyncio.CancelledError:
+                    # An Exception before Python 3.8.
+                    raise
+                except Exception as e:
+                    self.log.error('rtm.connect failed: %s', e)
+
+            if url is not None:
+                try:
+                    if (yield from self._receive(url)):
+                        attempt = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.log.exception('The RTM connection failed.')
+                url = None
+
+            delay = backoff(attempt)
+            attempt += 1
+            self.log.warning('Reconnecting to the RTM in %.1fs.', delay)
+            yield from asyncio.sleep(delay)
+
+    @asyncio.coroutine
+    def _receive(self, url):
+        """
+        Receive the events from one WebSocket connection until it closes.
+
+        A ping is sent when the socket has been quiet for a while, and it is
+        considered stalled when the ping gets no answer.
+
+        :returns: whether the connection was successfully established.
+        :rtype: bool
+        """
+        hello = False
         with ClientSession() as session:
-            ws = yield from session._ws_connect(self.rtm['url'])
+            ws = yield from session._ws_connect(url)
             self.ws = ws
+            # Events may have been missed while disconnected, the users and
+            # the channels are kept up to date by the events.
+            self.polls.mark_stale()
             try:
+                pinged = False
                 while True:
-                    msg = yield from ws.receive()
-                    if msg.tp == MsgType.close:
-                        break
-
-                    assert msg.tp == MsgType.text
-                    message = json.loads(msg.data)
-                    yield from self.queue.put(message)
+                    try:
+                        msg = yield from asyncio.wait_for(ws.receive(),
+                                                          RTM_PING_INTERVAL)
+                    except asyncio.TimeoutError:
+                        if pinged:
+                            self.log.warning('The RTM connection stalled.')
+                            return hello
+                        ws.send_str(dumps({'id': next(self._ids),
+                                           'type': 'ping'}))
+                        pinged = True
+                        continue
+
+                    pinged = False
+                    if msg.tp in (MsgType.close, MsgType.closed,
+                                  MsgType.error):
+                        return hello
+                    if msg.tp not in (MsgType.text, MsgType.binary) or \
+                            not self.events(msg.data):
+                        continue
+
+                    # Binary frames go to the decoder as is.
+                    message = loads(msg.data)
+                    RTM_EVENTS.labels(message.get('type')).inc()
+                    if message.get('type') == 'hello':
+                        hello = True
+                    elif message.get('type') == 'goodbye':
+                        return hello
+                    if not (yield from self.queue.offer(message)):
+                        self.log.debug('Queue full, dropped %s.',
+                                       message.get('type'))
             finally:
+                self.ws = None
                 yield from ws.close()
 
+    @staticmethod
+    def _dropped(type_):
+        """Count an event dropped by the filter."""
+        type_ = type_ or 'unknown'
+        RTM_EVENTS.labels(type_).inc()
+        RTM_DROPPED.labels(type_).inc()
+
     @asyncio.coroutine
     def _consume(self):
-        """Consume the messages from the queue."""
+        """Consume the messages from the queue, one at a time."""
         while True:
             message = yield from self.queue.get()
-            asyncio.ensure_future(self.on_message(message))
+            try:
+                yield from self.on_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.log.exception('Failed handling a %s event.',
+                                   message.get('type'))
+
+    def stats(self):
+        """
+        Runtime metrics of the bot.
+
+        :rtype: dict
+        """
+        return {'filtered': dict(self.events.dropped),
+                'queue': self.queue.stats(),
+                'open_polls': len(self.polls),
+                'pending_calls': len(self.scheduler)}
+
+    def collect(self):
+        """Update the gauges of the metrics."""
+        name = self.rtm['team']['domain'] if self.rtm else str(self)
+        QUEUE_DEPTH.labels(name).set(self.queue.qsize())
+        OPEN_POLLS.labels(name).set(len(self.polls))
+        PENDING_CALLS.labels(name).set(len(self.scheduler))
 
     @asyncio.coroutine
     def on_message(self, message):
         """Handle a message."""
-        self.log.debug("GOT %s", message)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("GOT %s", message)
+
+        if message.get('type') in ('reaction_added', 'reaction_removed'):
+            self.on_reaction(message)
+            return
+        if message.get('type') in ('user_change', 'team_join'):
+            self.index_users([message['user']])
+            return
+        if self.directory.handle(message):
+            # A channel to post to may have been created, or joined.
+            self.resolve_channels()
+            return
 
         # 'D' means direct channel.
         if 'user' in message and message['user'] == self.rtm['self']['id']:
@@ -109,114 +430,333 @@ class Bot:
         if 'text' not in message:
             return
 
-        question, emojis = extract(message['text'])
+        start = time.monotonic()
+
+        # The DM may start with the channel to post to.
+        channel_id, body = extract_channel(message['text'])
+        if channel_id in self.directory and \
+                channel_id in self.channel_ids.values():
+            message_text = body
+        else:
+            channel_id = self.channel_id
+            message_text = message['text']
+        if channel_id not in self.directory:
+            self.log.error('#%s is archived or was not found.', self.channel)
+            return
+
+        question, emojis = extract(message_text)
         title, text = (question + "\n").split("\n", 1)
         text = text.strip()
 
         self.log.info('Add new question: %s', title)
         response = yield from self.call(
             'chat.postMessage',
-            channel=self.channel_id,
+            priority=PRIORITY_POLL,
+            channel=channel_id,
             username=self.name,
             text="<!here>",
             attachments=[{
                 "title": title,
                 "text": text,
                 "mrkdwn_in": ["text"],
-                "fields": [{
-                    "title": "By",
-                    "value": "".join(self.usernames(message['user'])),
-                    "short": True,
-                }, {
-                    "title": "Duration",
-                    "value": "{0:.1f}m".format(self.timeout / 60),
-                    "short": True,
-                }],
+                "fields": (yield from self.header(message['user'])),
             }],
             icon_emoji=':ballot_box_with_ballot:')
+        poll = Poll(response['channel'], response['ts'], title, text,
+                    time.time() + self.timeout,
+                    [e.strip(':') for e in emojis],
+                    author=message['user'])
+        if self.method == 'irv':
+            # The runoff needs the order of the reactions, the other tallies
+            # are only built when the results are shown.
+            poll.results = Tally(poll.options, self.method,
+                                 poll.users.number(self.rtm['self']['id']))
+        self.polls.add(poll)
+        if self.store is not None:
+            self.store.add(poll.record(self.rtm['team']['id']))
         # End of votes.
-        asyncio.ensure_future(self.cast_votes(title, text,
-                                              response['ts'],
-                                              timeout=self.timeout))
+        self.log.info('Wait %ds before closing vote.', self.timeout)
+        poll.timer = self.timers.schedule(self.timeout, self.cast_votes, poll)
         # Adds reactions to it.
+        task = self.seeding[poll.key] = asyncio.ensure_future(
+            self.seed_reactions(poll.channel, poll.ts, poll.options, start))
+        task.add_done_callback(lambda f: self.seeding.pop(poll.key, None))
+
+    @asyncio.coroutine
+    def header(self, author):
+        """
+        Describe who asked a poll, and for how long it is open.
+
+        :param author: user identifier, ``None`` if unknown
+        :type author: str
+        :returns: the fields of the attachment.
+        :rtype: list
+        """
+        fields = []
+        if author is not None:
+            fields.append({
+                "title": "By",
+                "value": "".join((yield from self.usernames(author))),
+                "short": True,
+            })
+        fields.append({
+            "title": "Duration",
+            "value": "{0:.1f}m".format(self.timeout / 60),
+            "short": True,
+        })
+        return fields
+
+    @asyncio.coroutine
+    def seed_reactions(self, channel, timestamp, emojis, start=None):
+        """
+        Add the reactions of a new poll, one after the other.
+
+        Slack shows the reactions in the order they were added, waiting for
+        each one keeps the options in order. The polls are seeded at the
+        same time, their calls are paced together by the scheduler.
+
+        :param emojis: the options, duplicates are ignored
+        :type emojis: list
+        :param start: time, from :py:func:`time.monotonic`, the poll was
+                      asked at
+        :type start: float
+        """
+        names = []
         for emoji in emojis:
-            self.log.info('Add reaction to %s: %s',
-                          response['ts'], emoji)
-            asyncio.ensure_future(self.call('reactions.add',
-                                            name=emoji.strip(':'),
-                                            channel=response['channel'],
-                                            timestamp=response['ts']))
+            name = emoji.strip(':')
+            if name and name not in names:
+                names.append(name)
+
+        for name in names:
+            if (channel, timestamp) not in self.polls:
+                # Closed, the other polls get the calls.
+                return
+            self.log.info('Add reaction to %s: %s', timestamp, name)
+            try:
+                response = yield from self.call('reactions.add',
+                                                priority=PRIORITY_REACTIONS,
+                                                name=name,
+                                                channel=channel,
+                                                timestamp=timestamp)
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                self.log.error('Failed adding %s to %s: %s',
+                               name, timestamp, e)
+                continue
+            if not response['ok']:
+                self.log.error('Failed adding %s to %s: %s',
+                               name, timestamp, response['error'])
+
+        if start is not None:
+            POLL_READY.observe(time.monotonic() - start)
+
+    def on_reaction(self, message):
+        """Update the tally of a poll from a reaction event."""
+        item = message.get('item', {})
+        poll = self.polls.get(item.get('channel'), item.get('ts'))
+        if poll is None:
+            return
+
+        user = poll.users.number(message['user'])
+        if message['type'] == 'reaction_added':
+            changed = poll.vote(message['reaction'], user)
+        else:
+            changed = poll.unvote(message['reaction'], user)
+        if changed and self.live is not None:
+            self.live.touch(poll.key, poll)
+
+    def tally(self, poll):
+        """
+        Rank the options of a poll, from its :py:class:`votebot.results.Tally`.
+
+        Only the options the bot reacted with are counted, and the bot is
+        not a voter.
+
+        :returns: the score and emoji name of each option, best first.
+        :rtype: list
+        """
+        me = poll.users.number(self.rtm['self']['id'])
+        results = poll.results
+        if results is None:
+            # Not shown yet, then followed. A restored poll has no options,
+            # they are the reactions of the bot.
+            options = poll.options or [n for n in (poll.votes or ())
+                                       if poll.voters(n) >> me & 1]
+            results = Tally(options, self.method, me)
+            results.reset(poll.votes)
+            if not poll.stale:
+                poll.results = results
+        # Ignore: non-initial votes.
+        return [(score, name) for score, name in results.ranking()
+                if poll.voters(name) >> me & 1]
+
+    def voters(self, poll, names):
+        """
+        Find who is counted for each option.
+
+        :param names: the emoji names
+        :type names: list
+        :returns: the voters bitset of each option.
+        :rtype: list
+        """
+        excluded = 1 << poll.users.number(self.rtm['self']['id'])
+        if self.method == 'plurality':
+            # The users who picked several options aren't counted.
+            excluded |= poll.multiple(names)
+        return [poll.voters(name) & ~excluded for name in names]
 
     @asyncio.coroutine
-    def cast_votes(self, title, text, timestamp, timeout):
+    def show_results(self, poll):
         """
-        End a vote by displaying the results and delete the original message.
+        Update the message of an open poll with its current votes.
+
+        Nothing is sent when the counts didn't change since the last time.
+
+        :param poll: the poll to update
+        :type poll: :py:class:`votebot.poll.Poll`
+        """
+        if self.future.done() or poll.key not in self.polls:
+            return
 
-        :param title: Initial question title.
-        :type title: str
-        :param text: Initial question body.
-        :type text: str
-        :param timestamp: message identifier
-        :type timestamp: str
-        :param timeout: how many seconds before closing the votes
-        :type int:
-        """
-        self.log.info('Wait %ds before closing vote.', timeout)
-        done, pending = yield from asyncio.wait(
-            [self.future, asyncio.sleep(timeout)],
-            return_when=asyncio.FIRST_COMPLETED
-        )
-
-        if self.future in done:
+        ranking = self.tally(poll)
+        if ranking == poll.shown:
             return
+        poll.shown = ranking
+
+        fields = yield from self.header(poll.author)
+        fields.extend({'title': ':{0}: {1}'.format(n, display(score)),
+                       'short': True}
+                      for score, n in ranking)
+        self.call_nowait('chat.update',
+                         priority=PRIORITY_LIVE,
+                         channel=poll.channel,
+                         ts=poll.ts,
+                         text='<!here>',
+                         attachments=[{
+                             'title': poll.title,
+                             'text': poll.text,
+                             'mrkdwn_in': ['text'],
+                             'fields': fields,
+                         }])
 
-        response = yield from self.call('reactions.get',
-                                        channel=self.channel_id,
-                                        timestamp=timestamp)
+    @asyncio.coroutine
+    def cast_votes(self, poll):
+        """
+        End a vote by displaying the results and delete the original message.
 
-        fields = []
-        for a in response['message']['reactions']:
-            # Ignore: non-initial votes.
-            if self.rtm['self']['id'] in a['users']:
-                fields.append((a['count']-1, a['name'], a['users']))
-        sorted(fields)
+        :param poll: the poll to close
+        :type poll: :py:class:`votebot.poll.Poll`
+        """
+        if self.future.done():
+            return
 
+        title, text, channel, timestamp = (poll.title, poll.text,
+                                           poll.channel, poll.ts)
+        self.polls.pop(channel, timestamp)
+        seeding = self.seeding.pop(poll.key, None)
+        if seeding is not None:
+            # Its reactions waiting for their turn are dropped.
+            seeding.cancel()
+        if self.live is not None:
+            self.live.cancel(poll.key)
+        if poll.stale:
+            # Reconcile with the server when the votes cannot be trusted.
+            try:
+                response = yield from self.call('reactions.get',
+                                                priority=PRIORITY_RESULTS,
+                                                channel=channel,
+                                                timestamp=timestamp)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                response = {'ok': False, 'error': e}
+            if response['ok']:
+                poll.load(response['message'].get('reactions', []))
+            else:
+                # The votes seen in the events are better than none.
+                self.log.error('Failed fetching the votes of %s: %s',
+                               title, response['error'])
+
+        ranking = self.tally(poll)
+        voters = self.voters(poll, [name for _, name in ranking])
+        # The voters not in the cache are mentioned, Slack shows their
+        # names. Fetching them would delay the results by minutes.
+        names = yield from asyncio.gather(
+            *[self.usernames(*poll.users.ids(bits), fetch=False)
+              for bits in voters])
         attachments = [{
             'title': title,
             'text': text,
             'mrkdwn_in': ['text'],
-            'fields': [{'title': ':{0}: {1}'.format(n, c),
-                        'value': ', '.join(self.usernames(*u))}
-                       for c, n, u in fields]
+            'fields': [{'title': ':{0}: {1}'.format(n, display(score)),
+                        'value': ', '.join(v)}
+                       for (score, n), v in zip(ranking, names)]
         }]
 
-        asyncio.ensure_future(self.call('chat.postMessage',
-                                        channel=self.channel_id,
-                                        username=self.name,
-                                        attachments=attachments,
-                                        icon_emoji=':ballot_box_with_ballot:'))
+        self.call_nowait('chat.postMessage',
+                         priority=PRIORITY_RESULTS,
+                         channel=channel,
+                         username=self.name,
+                         attachments=attachments,
+                         icon_emoji=':ballot_box_with_ballot:')
 
         self.log.info("Deleting %s", title)
-        asyncio.ensure_future(self.call('chat.delete',
-                                        channel=self.channel_id,
-                                        ts=timestamp))
+        self.call_nowait('chat.delete',
+                         priority=PRIORITY_RESULTS,
+                         channel=channel,
+                         ts=timestamp)
+        # Forgotten once the results are on their way only, a crash leaves
+        # it to the next run.
+        if self.store is not None:
+            self.store.remove(self.rtm['team']['id'], channel, timestamp)
+
+    def index_users(self, users):
+        """
+        Record the names of the given users.
+
+        :param users: user objects from the Slack API
+        :type users: list
+        """
+        self.users.update(users)
+
+    @asyncio.coroutine
+    def _fetch_user(self, id_):
+        response = yield from self.call('users.info', user=id_)
+        if not response['ok']:
+            self.log.error('%s was not found: %s', id_, response['error'])
+            return None
+        return response['user']
 
-    def usernames(self, *ids):
+    @asyncio.coroutine
+    def usernames(self, *ids, fetch=True):
         r"""
         Convert the user ids into username.
 
+        The missing users are fetched at the same time.
+
         :param \*ids: see below
+        :param fetch: whether the users missing from the cache are fetched
+        :type fetch: bool
 
         :arguments: a list of user identifiers
+        :returns: the names, a mention of the users which cannot be found.
+        :rtype: list
         """
-        ids = set(ids)
-        me = self.rtm['self']['id']
-        if me in ids:
-            ids.remove(me)
-        for user in self.rtm['users']:
-            if user['id'] in ids:
-                ids.remove(user['id'])
-                yield user['name']
+        seen = {self.rtm['self']['id']}
+        unique = []
+        names = []
         for id_ in ids:
-            self.log.error('%s was not found in the RTM.', id_)
-            yield '<@{0}>'.format(id_)
+            if id_ not in seen:
+                seen.add(id_)
+                unique.append(id_)
+                names.append(self.users.get(id_))
+
+        missing = [i for i, name in enumerate(names) if name is None]
+        if missing and fetch:
+            found = yield from asyncio.gather(
+                *[self.users.resolve(unique[i]) for i in missing])
+            for i, name in zip(missing, found):
+                names[i] = name
+        return ['<@{0}>'.format(id_) if name is None else name
+                for id_, name in zip(unique, names)]
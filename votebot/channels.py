@@ -0,0 +1,134 @@
+"""
+Directory of the channels.
+
+The :py:class:`ChannelDirectory` indexes the channels and the private
+channels (groups) of a workspace by id and by name. It is filled from
+``conversations.list`` and kept up to date by the RTM events, so that
+finding a channel never scans the workspace.
+"""
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+class ChannelDirectory:
+    """
+    Channels by id and by name.
+
+    The archived channels are remembered, but they cannot be found by name.
+
+    >>> directory = ChannelDirectory()
+    >>> directory.add({'id': 'C1', 'name': 'general'})
+    >>> directory.handle({'type': 'channel_rename',
+    ...                   'channel': {'id': 'C1', 'name': 'town-square'}})
+    True
+    >>> directory.id_for('town-square')
+    'C1'
+    """
+
+    EVENTS = ('channel_archive', 'channel_created', 'channel_deleted',
+              'channel_rename', 'channel_unarchive', 'group_archive',
+              'group_joined', 'group_left', 'group_rename',
+              'group_unarchive')
+    """RTM events updating the directory."""
+
+    def __init__(self):
+        """Initialize an empty directory."""
+        self.names = {}
+        self.ids = {}
+        self.archived = set()
+        self.log = LOG
+
+    def __len__(self):
+        """Number of known channels."""
+        return len(self.names)
+
+    def __contains__(self, id_):
+        """Whether the channel exists and is not archived."""
+        return id_ in self.names and id_ not in self.archived
+
+    def add(self, channel):
+        """
+        Record a channel.
+
+        :param channel: channel object from the Slack API
+        :type channel: dict
+        """
+        self.rename(channel['id'], channel['name'])
+        if 'is_archived' in channel:
+            self.archive(channel['id'], channel['is_archived'])
+
+    def update(self, channels):
+        """Record the channels of a ``conversations.list`` page."""
+        for channel in channels:
+            self.add(channel)
+
+    def rename(self, id_, name):
+        """Change the name of a channel, or record a new one."""
+        old = self.names.get(id_)
+        if old is not None and self.ids.get(old) == id_:
+            del self.ids[old]
+        self.names[id_] = name
+        if id_ not in self.archived:
+            self.ids[name] = id_
+
+    def archive(self, id_, archived=True):
+        """Flag a channel as archived, or not."""
+        name = self.names.get(id_)
+        if archived:
+            self.archived.add(id_)
+            if name is not None and self.ids.get(name) == id_:
+                del self.ids[name]
+        else:
+            self.archived.discard(id_)
+            if name is not None:
+                self.ids[name] = id_
+
+    def remove(self, id_):
+        """Forget a channel."""
+        self.archive(id_)
+        self.archived.discard(id_)
+        self.names.pop(id_, None)
+
+    def id_for(self, name):
+        """
+        Find a channel by name.
+
+        :returns: its id or ``None``.
+        :rtype: str
+        """
+        return self.ids.get(name)
+
+    def name_for(self, id_):
+        """
+        Find the name of a channel.
+
+        :returns: its name or ``None``.
+        :rtype: str
+        """
+        return self.names.get(id_)
+
+    def handle(self, event):
+        """
+        Update the directory from an RTM event.
+
+        :returns: whether the event was about the channels.
+        :rtype: bool
+        """
+        type_ = event.get('type')
+        if type_ not in self.EVENTS:
+            return False
+
+        channel = event['channel']
+        if type_ in ('channel_created', 'group_joined',
+                     'channel_rename', 'group_rename'):
+            self.add(channel)
+        elif type_ in ('channel_archive', 'group_archive'):
+            self.archive(channel)
+        elif type_ in ('channel_unarchive', 'group_unarchive'):
+            self.archive(channel, False)
+        else:
+            # Deleted, or the bot can no longer post there.
+            self.remove(channel)
+        return True
@@ -0,0 +1,59 @@
+"""
+JSON codec used for the Web API and the RTM.
+
+The fastest available implementation is picked among `orjson`_, `ujson`_ and
+the standard library. Install them along with the ``fast`` extra.
+
+.. code-block:: shell
+
+    $ pip install slack-votebot[fast]
+
+Both :py:func:`dumps` and :py:func:`loads` behave like their :py:mod:`json`
+counterparts, except that :py:func:`loads` takes ``bytes`` as well, and
+decodes them without building an intermediate ``str`` when it can.
+
+.. _orjson: https://github.com/ijl/orjson
+.. _ujson: https://github.com/ultrajson/ultrajson
+
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+if orjson is not None:  # pragma: no cover
+    NAME = 'orjson'
+
+    def dumps(obj):
+        """Serialize an object to a JSON string."""
+        return orjson.dumps(obj).decode('utf-8')
+
+    loads = orjson.loads
+
+elif ujson is not None:  # pragma: no cover
+    NAME = 'ujson'
+    dumps = ujson.dumps
+    loads = ujson.loads
+
+else:
+    NAME = 'json'
+    dumps = json.dumps
+
+    def loads(data):
+        """
+        Deserialize a JSON document from a string or bytes.
+
+        >>> loads(b'{"type": "hello"}')
+        {'type': 'hello'}
+        """
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8')
+        return json.loads(data)
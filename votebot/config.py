@@ -6,6 +6,10 @@ import os
 SLACK_DOMAIN = 'slack.com'
 """Domain used by the Slack server."""
 
+SLACK_API_URL = os.environ.get('SLACK_API_URL',
+                               'https://{0}/api/'.format(SLACK_DOMAIN))
+"""Base URL of the Web API, e.g. to use :py:mod:`votebot.testing`."""
+
 SLACK_TOKEN = os.environ.get('SLACK_TOKEN')
 """Authentication token for the bot."""
 
@@ -14,3 +18,80 @@ SLACK_CHANNEL = os.environ.get('SLACK_CHANNEL', 'random')
 
 VOTE_TIMEOUT = int(os.environ.get('VOTE_TIMEOUT', 60))
 """Timeout for all the polls."""
+
+SINGLE_CHOICE = bool(os.environ.get('SINGLE_CHOICE'))
+"""Whether the users voting for several options are left out."""
+
+VOTE_METHOD = os.environ.get('VOTE_METHOD',
+                             'plurality' if SINGLE_CHOICE else 'approval')
+"""How the votes are counted, see :py:mod:`votebot.results`."""
+
+LIVE_RESULTS = bool(os.environ.get('LIVE_RESULTS'))
+"""Whether the poll message shows the votes as they come."""
+
+LIVE_RESULTS_DELAY = float(os.environ.get('LIVE_RESULTS_DELAY', 2))
+"""Seconds the votes on a poll are gathered before showing them."""
+
+LIVE_RESULTS_RATE = float(os.environ.get('LIVE_RESULTS_RATE', 0.5))
+"""Live updates per second, per bot and for all its polls."""
+
+VOTEBOT_CONFIG = os.environ.get('VOTEBOT_CONFIG')
+"""JSON file describing several workspaces, see :py:mod:`votebot.runtime`."""
+
+VOTEBOT_WORKERS = int(os.environ.get('VOTEBOT_WORKERS', 0))
+"""Worker processes sharing the workspaces, none runs them in-process."""
+
+STATS_INTERVAL = float(os.environ.get('STATS_INTERVAL', 10))
+"""Seconds between two metrics reports of a worker process."""
+
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))
+"""Port serving the Prometheus metrics, each worker uses the next ones."""
+
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+"""Address serving the metrics, only reachable locally by default."""
+
+HTTP_LIMIT = int(os.environ.get('HTTP_LIMIT', 20))
+"""Maximum number of simultaneous HTTP connections, all to the Slack server."""
+
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', 30))
+"""Seconds an idle HTTP connection is kept open."""
+
+UPLOAD_TIMEOUT = float(os.environ.get('UPLOAD_TIMEOUT', 300))
+"""Seconds a call uploading a file may take, 10 for the other calls."""
+
+API_CONCURRENCY = int(os.environ.get('API_CONCURRENCY', 8))
+"""Maximum number of Web API calls in flight, per bot."""
+
+RTM_PING_INTERVAL = float(os.environ.get('RTM_PING_INTERVAL', 10))
+"""Seconds of silence before pinging the RTM, and waiting for the pong."""
+
+RECONNECT_BASE = float(os.environ.get('RECONNECT_BASE', 1))
+"""Seconds before the first reconnection attempt, doubled each failure."""
+
+RECONNECT_MAX = float(os.environ.get('RECONNECT_MAX', 60))
+"""Maximum seconds between two reconnection attempts."""
+
+CONSUMERS = int(os.environ.get('CONSUMERS', 8))
+"""Number of workers handling the RTM events."""
+
+QUEUE_SIZE = int(os.environ.get('QUEUE_SIZE', 1000))
+"""Capacity of the RTM events queue."""
+
+QUEUE_POLICY = os.environ.get('QUEUE_POLICY', 'block')
+"""What to do when the queue is full: block, drop-oldest or drop."""
+
+QUEUE_DROPPABLE = tuple(t for t in os.environ.get(
+    'QUEUE_DROPPABLE', 'user_typing,presence_change').split(',') if t)
+"""Event types dropped rather than queued when the queue is full."""
+
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+"""Maximum number of user names kept in memory, per bot."""
+
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 3600))
+"""Seconds before a user name is fetched again."""
+
+POLL_STORE = os.environ.get('POLL_STORE', 'votebot.sqlite3')
+"""Where the open polls are kept, ``.log`` for a log, empty to disable."""
+
+STORE_INTERVAL = float(os.environ.get('STORE_INTERVAL', 1))
+"""Seconds between two writes of the open polls."""
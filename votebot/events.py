@@ -0,0 +1,144 @@
+"""
+Handling of the Real-Time Messaging events.
+
+The frames received from the WebSocket first go through an
+:py:class:`EventFilter` which discards the uninteresting events before they
+get decoded. The others wait in a bounded :py:class:`EventQueue` for a fixed
+pool of consumers. When the queue is full, its policy decides between pushing
+back on the socket or dropping events.
+"""
+
+import asyncio
+import collections
+import re
+
+BLOCK = 'block'
+"""Wait for room in the queue (backpressure on the WebSocket)."""
+
+DROP_OLDEST = 'drop-oldest'
+"""Make room by dropping the oldest event of the queue."""
+
+DROP = 'drop'
+"""Drop the new event."""
+
+_TYPE = re.compile(r'"type"\s*:\s*"([a-z_]+)"')
+_DIRECT = re.compile(r'"channel"\s*:\s*"D')
+_TYPE_BYTES = re.compile(_TYPE.pattern.encode('ascii'))
+_DIRECT_BYTES = re.compile(_DIRECT.pattern.encode('ascii'))
+
+
+class EventFilter:
+    """
+    Cheap filter on the raw JSON frames.
+
+    Quotes inside JSON strings are escaped, so a ``"type":"..."`` pair found
+    in the raw frame is a genuine key of the event or of a nested object. A
+    frame with none of the wanted types, or a message not sent to a direct
+    channel, cannot be of interest and is dropped without being decoded.
+
+    :param types: event types to keep
+    :type types: iterable
+    :param on_drop: called with the type of each dropped frame, ``None``
+                    when it has none
+    :type on_drop: callable
+
+    >>> keep = EventFilter(['message', 'reaction_added'])
+    >>> keep('{"type":"user_typing","channel":"D1","user":"U1"}')
+    False
+    >>> keep('{"type":"message","channel":"C1","text":"hi"}')
+    False
+    >>> keep('{"type":"message","channel":"D1","text":"hi"}')
+    True
+    """
+
+    def __init__(self, types, *, on_drop=None):
+        """Initialize the filter."""
+        self.types = frozenset(types)
+        self.dropped = collections.Counter()
+        self.on_drop = on_drop
+
+    def __call__(self, raw):
+        """
+        Tell whether the frame may be of interest.
+
+        :param raw: the JSON frame
+        :type raw: str or bytes
+        :rtype: bool
+        """
+        if isinstance(raw, str):
+            types = _TYPE.findall(raw)
+            direct = _DIRECT
+        else:
+            types = [t.decode('ascii') for t in _TYPE_BYTES.findall(raw)]
+            direct = _DIRECT_BYTES
+        wanted = self.types.intersection(types)
+        if not wanted:
+            self._drop(types[0] if types else None)
+            return False
+        if wanted == {'message'} and not direct.search(raw):
+            self._drop('message')
+            return False
+        return True
+
+    def _drop(self, type_):
+        self.dropped[type_] += 1
+        if self.on_drop is not None:
+            self.on_drop(type_)
+
+
+class EventQueue(asyncio.Queue):
+    """
+    Bounded queue of events with an overflow policy.
+
+    :param maxsize: capacity of the queue, ``0`` is unbounded
+    :type maxsize: int
+    :param policy: :py:data:`BLOCK`, :py:data:`DROP_OLDEST` or
+                   :py:data:`DROP`
+    :type policy: str
+    :param droppable: event types always dropped when the queue is full,
+                      whatever the policy
+    :type droppable: iterable
+    """
+
+    def __init__(self, maxsize=0, *, policy=BLOCK, droppable=()):
+        """Initialize the queue."""
+        if policy not in (BLOCK, DROP_OLDEST, DROP):
+            raise ValueError('Unknown overflow policy {0!r}.'.format(policy))
+        super().__init__(maxsize)
+        self.policy = policy
+        self.droppable = frozenset(droppable)
+        self.dropped = collections.Counter()
+        self.high_water = 0
+
+    @asyncio.coroutine
+    def offer(self, event):
+        """
+        Put an event in the queue, applying the overflow policy.
+
+        :param event: the decoded event
+        :type event: dict
+        :returns: whether the event was queued.
+        :rtype: bool
+        """
+        if self.full():
+            type_ = event.get('type')
+            if self.policy == DROP or type_ in self.droppable:
+                self.dropped[type_] += 1
+                return False
+            if self.policy == DROP_OLDEST:
+                self.dropped[self.get_nowait().get('type')] += 1
+
+        yield from self.put(event)
+        self.high_water = max(self.high_water, self.qsize())
+        return True
+
+    def stats(self):
+        """
+        Sizing metrics of the queue.
+
+        :rtype: dict
+        """
+        return {'depth': self.qsize(),
+                'maxsize': self.maxsize,
+                'high_water': self.high_water,
+                'dropped': dict(self.dropped)}
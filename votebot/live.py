@@ -0,0 +1,99 @@
+"""
+Live results.
+
+When enabled, the poll message is edited with ``chat.update`` to show the
+votes as they come. The :py:class:`Debouncer` gathers the changes of a poll
+for a short while so that a flurry of reactions leads to a single update,
+and a :py:class:`votebot.ratelimit.TokenBucket` shared by all the polls caps
+the number of updates of the bot.
+
+.. code-block:: python
+
+    debouncer = Debouncer(timers, show, delay=2, rate=0.5)
+    # Many reactions, a single call of show(poll) two seconds later.
+    for event in events:
+        debouncer.touch(poll.key, poll)
+
+"""
+
+import logging
+import time
+
+from .config import LIVE_RESULTS_DELAY, LIVE_RESULTS_RATE
+from .ratelimit import BURST, TokenBucket
+
+LOG = logging.getLogger(__name__)
+
+
+class Debouncer:
+    """
+    Coalesce the changes by key, within a global budget.
+
+    The callback is called once ``delay`` seconds after the first change of
+    a key, whatever the number of changes in the meantime. When the budget
+    is spent, it is postponed until a token is available.
+
+    :param timers: the timers to schedule the callbacks with
+    :type timers: :py:class:`votebot.timers.Timers`
+    :param callback: function called with the arguments of the first change,
+                     it may return a coroutine
+    :type callback: callable
+    :param delay: seconds the changes are gathered
+    :type delay: float
+    :param rate: calls per second, for all the keys
+    :type rate: float
+    :param burst: calls that may be made at once
+    :type burst: float
+    """
+
+    def __init__(self, timers, callback, *, delay=None, rate=None,
+                 burst=None, clock=time.monotonic):
+        """Initialize the debouncer, without any pending change."""
+        self.timers = timers
+        self.callback = callback
+        self.delay = LIVE_RESULTS_DELAY if delay is None else delay
+        rate = rate or LIVE_RESULTS_RATE
+        self.bucket = TokenBucket(rate, burst or rate * BURST, clock=clock)
+        self.pending = {}
+        self.log = LOG
+
+    def __len__(self):
+        """Number of keys waiting for their call."""
+        return len(self.pending)
+
+    def __contains__(self, key):
+        """Whether a call is pending for the key."""
+        return key in self.pending
+
+    def touch(self, key, *args):
+        r"""
+        Record a change.
+
+        :param key: what changed, e.g. a poll key
+        :param \*args: arguments of the callback, when none is pending
+        """
+        if key not in self.pending:
+            self.pending[key] = self.timers.schedule(self.delay, self._fire,
+                                                     key, args)
+
+    def cancel(self, key):
+        """Drop the pending call of a key, if any."""
+        timer = self.pending.pop(key, None)
+        if timer is not None:
+            self.timers.cancel(timer)
+
+    def close(self):
+        """Drop all the pending calls."""
+        for key in list(self.pending):
+            self.cancel(key)
+
+    def _fire(self, key, args):
+        wait = self.bucket.delay()
+        if wait:
+            # Out of budget, the changes keep being gathered.
+            self.pending[key] = self.timers.schedule(wait, self._fire,
+                                                     key, args)
+            return None
+        self.bucket.take()
+        del self.pending[key]
+        return self.callback(*args)
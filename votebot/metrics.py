@@ -0,0 +1,363 @@
+"""
+Metrics of the running bots.
+
+The bots count their API calls, the rate limits they hit and the events they
+receive, the queues and the open polls are measured when the metrics are
+collected. They are served in the Prometheus text format when
+``METRICS_PORT`` is set.
+
+.. code-block:: shell
+
+    $ export METRICS_PORT=9100
+    $ python -m votebot &
+    $ curl http://localhost:9100/metrics
+
+Otherwise the metrics go to a :py:class:`NullRegistry`, whose operations do
+nothing, so the instrumentation of the hot paths costs a method call.
+"""
+
+import asyncio
+import bisect
+import logging
+
+from .config import METRICS_HOST, METRICS_PORT
+
+LOG = logging.getLogger(__name__)
+
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+"""Upper bounds, in seconds, of the histogram buckets."""
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\')
+                      .replace('"', '\\"')
+                      .replace('\n', '\\n'))
+
+
+class Metric:
+    """
+    Family of samples sharing a name, one per set of label values.
+
+    :param name: name of the metric
+    :type name: str
+    :param help: description of the metric
+    :type help: str
+    :param labels: names of the labels
+    :type labels: tuple
+    """
+
+    TYPE = None
+
+    def __init__(self, name, help, labels=()):
+        """Initialize an empty metric."""
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.children = {}
+        if not self.labelnames:
+            self.children[()] = self._child()
+
+    def labels(self, *values):
+        """
+        Get the sample of the given label values.
+
+        >>> calls = Counter('calls_total', 'Calls.', ('method',))
+        >>> calls.labels('api.test').inc()
+        >>> calls.labels('api.test').value
+        1
+        """
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._child()
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def _labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{{{0}}}'.format(','.join(
+            '{0}="{1}"'.format(k, _escape(v)) for k, v in pairs))
+
+    def render(self):
+        """Lines of the text exposition format."""
+        yield '# HELP {0} {1}'.format(self.name, self.help)
+        yield '# TYPE {0} {1}'.format(self.name, self.TYPE)
+        for values, child in sorted(self.children.items()):
+            yield from self._render(self._labels(values), values, child)
+
+    def _render(self, labels, values, child):
+        yield '{0}{1} {2}'.format(self.name, labels, child.value)
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    """Monotonic count, e.g. of calls."""
+
+    TYPE = 'counter'
+
+    def _child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        """Increment the counter without labels."""
+        self.children[()].inc(amount)
+
+
+class Gauge(Metric):
+    """Value going up and down, e.g. a queue depth."""
+
+    TYPE = 'gauge'
+
+    def _child(self):
+        return _Value()
+
+    def set(self, value):
+        """Set the gauge without labels."""
+        self.children[()].set(value)
+
+
+class _Observations:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations, e.g. of latencies.
+
+    :param buckets: upper bounds of the buckets
+    :type buckets: tuple
+    """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        """Initialize an empty histogram."""
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _child(self):
+        return _Observations(self.buckets)
+
+    def observe(self, value):
+        """Record an observation without labels."""
+        self.children[()].observe(value)
+
+    def _render(self, labels, values, child):
+        total = 0
+        bounds = [str(b) for b in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, child.counts):
+            total += count
+            yield '{0}_bucket{1} {2}'.format(
+                self.name, self._labels(values, [('le', bound)]), total)
+        yield '{0}_sum{1} {2}'.format(self.name, labels, child.sum)
+        yield '{0}_count{1} {2}'.format(self.name, labels, child.count)
+
+
+class Registry:
+    """Collection of metrics."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self.metrics = []
+        self.collectors = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        """Create a :py:class:`Counter`."""
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        """Create a :py:class:`Gauge`."""
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        """Create a :py:class:`Histogram`."""
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def register(self, collector):
+        """
+        Call the collector before each collection.
+
+        It updates the metrics whose value is cheaper to read on demand,
+        e.g. the depth of a queue.
+        """
+        self.collectors.append(collector)
+
+    def unregister(self, collector):
+        """Stop calling the collector."""
+        self.collectors.remove(collector)
+
+    def render(self):
+        """
+        Collect the metrics in the Prometheus text format.
+
+        :rtype: str
+        """
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                LOG.exception('Failed collecting the metrics.')
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class NullMetric:
+    """Metric ignoring everything."""
+
+    def labels(self, *values):
+        """Return itself."""
+        return self
+
+    def inc(self, amount=1):
+        """Do nothing."""
+
+    def dec(self, amount=1):
+        """Do nothing."""
+
+    def set(self, value):
+        """Do nothing."""
+
+    def observe(self, value):
+        """Do nothing."""
+
+
+class NullRegistry(Registry):
+    """Registry of the disabled metrics."""
+
+    NULL = NullMetric()
+
+    def _add(self, metric):
+        return self.NULL
+
+    def register(self, collector):
+        """Ignore the collector."""
+
+    def unregister(self, collector):
+        """Ignore the collector."""
+
+
+REGISTRY = Registry() if METRICS_PORT else NullRegistry()
+"""Registry of the process, enabled by ``METRICS_PORT``."""
+
+API_LATENCY = REGISTRY.histogram(
+    'votebot_api_latency_seconds',
+    'Latency of the Web API calls.',
+    ('method',))
+API_RATE_LIMITED = REGISTRY.counter(
+    'votebot_api_rate_limited_total',
+    'Web API calls answered with HTTP 429.',
+    ('method',))
+API_ERRORS = REGISTRY.counter(
+    'votebot_api_errors_total',
+    'Web API calls answered with an unexpected HTTP status.',
+    ('method',))
+RTM_EVENTS = REGISTRY.counter(
+    'votebot_rtm_events_total',
+    'Events received from the RTM, dropped or not.',
+    ('type',))
+RTM_DROPPED = REGISTRY.counter(
+    'votebot_rtm_dropped_total',
+    'Events dropped by the filter, without being decoded.',
+    ('type',))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'votebot_queue_depth',
+    'Events waiting to be handled.',
+    ('bot',))
+OPEN_POLLS = REGISTRY.gauge(
+    'votebot_open_polls',
+    'Polls waiting for their deadline.',
+    ('bot',))
+PENDING_CALLS = REGISTRY.gauge(
+    'votebot_pending_calls',
+    'Web API calls waiting for their rate limit.',
+    ('bot',))
+POLL_READY = REGISTRY.histogram(
+    'votebot_poll_ready_seconds',
+    'Time from asking a poll to its reactions being all seeded.')
+LOOP_LAG = REGISTRY.histogram(
+    'votebot_loop_lag_seconds',
+    'Delay of the event loop in running a scheduled callback.',
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1))
+
+
+@asyncio.coroutine
+def monitor_lag(interval=1):
+    """
+    Measure the lag of the event loop, until cancelled.
+
+    :param interval: seconds between two measures
+    :type interval: float
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        yield from asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0, loop.time() - start - interval))
+
+
+@asyncio.coroutine
+def serve(host=None, port=None, registry=None):
+    """
+    Serve the metrics over HTTP on ``/metrics``.
+
+    :param host: address to listen on, ``METRICS_HOST`` by default
+    :type host: str
+    :param port: TCP port, ``METRICS_PORT`` by default
+    :type port: int
+    :returns: the server and the lag monitor, to be closed and cancelled.
+    :rtype: tuple
+    """
+    # Only needed when the metrics are enabled.
+    from aiohttp import web
+
+    registry = REGISTRY if registry is None else registry
+
+    @asyncio.coroutine
+    def handle(request):
+        return web.Response(
+            body=registry.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4'})
+
+    app = web.Application()
+    app.router.add_route('GET', '/metrics', handle)
+    loop = asyncio.get_event_loop()
+    host = host or METRICS_HOST
+    server = yield from loop.create_server(app.make_handler(), host,
+                                           port or METRICS_PORT)
+    LOG.info('Serving the metrics on %s:%d.', host, port or METRICS_PORT)
+    return server, asyncio.ensure_future(monitor_lag())
@@ -0,0 +1,257 @@
+"""
+The open polls.
+
+A :py:class:`Poll` holds everything needed to close a poll: where it is, its
+question, its deadline and the votes collected from the reaction events. It
+uses ``__slots__`` and the emoji names are interned, so that they are shared
+by all the polls. The :py:class:`PollRegistry` finds them back by message.
+
+The votes are also given to the :py:class:`votebot.results.Tally` of the
+poll, if any, which keeps the results as they change.
+
+The voters of each option are a bitset, an ``int`` whose bits are the
+numbers given to the users by the :py:class:`votebot.users.UserIndex` of the
+poll. Counting the votes, or finding who voted several times, takes a few
+operations on integers.
+"""
+
+import sys
+
+from .users import UserIndex
+
+
+def popcount(bits):
+    """
+    Count the bits set.
+
+    >>> popcount(0b1011)
+    3
+    """
+    return bin(bits).count('1')
+
+
+class Poll:
+    """
+    An open poll.
+
+    :param channel: channel identifier
+    :type channel: str
+    :param ts: timestamp of the message
+    :type ts: str
+    :param title: the question
+    :type title: str
+    :param text: its description
+    :type text: str
+    :param deadline: UNIX time the poll closes at
+    :type deadline: float
+    :param options: emoji names offered as answers
+    :type options: list
+    :param author: identifier of the user who asked
+    :type author: str
+
+    >>> poll = Poll('C1', '1.0', 'Lunch?', '', 0, ['pizza', 'sushi'])
+    >>> poll.vote('pizza', 1)
+    True
+    >>> poll.count('pizza')
+    1
+    """
+
+    __slots__ = ('channel', 'ts', 'title', 'text', 'deadline', 'options',
+                 'author', 'users', 'votes', 'stale', 'timer', 'shown',
+                 'results')
+
+    def __init__(self, channel, ts, title, text, deadline, options=(),
+                 author=None):
+        """Initialize a poll without votes."""
+        self.channel = channel
+        self.ts = ts
+        self.title = title
+        self.text = text
+        self.deadline = deadline
+        self.options = tuple(sys.intern(o) for o in options)
+        self.author = author
+        # Numbers of the users, the bits of the votes.
+        self.users = UserIndex()
+        # Bitset of the voters by emoji name, created with the first vote.
+        self.votes = None
+        # Whether reaction events may have been missed.
+        self.stale = False
+        # Expiry timer, see votebot.timers.
+        self.timer = None
+        # Results last shown by the live results.
+        self.shown = None
+        # Tally of the votes, see votebot.results.
+        self.results = None
+
+    def __repr__(self):
+        """Representation for the logs."""
+        return '<Poll({0}/{1} {2!r})>'.format(self.channel, self.ts,
+                                              self.title)
+
+    @property
+    def key(self):
+        """Identify the poll by its message."""
+        return self.channel, self.ts
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Create a poll from a stored record.
+
+        Its votes, which aren't stored, are to be fetched.
+        """
+        poll = cls(record['channel'], record['ts'], record['title'],
+                   record['text'], record['deadline'])
+        poll.stale = True
+        return poll
+
+    def record(self, team):
+        """
+        Describe the poll for a :py:class:`votebot.store.Store`.
+
+        :param team: team identifier
+        :type team: str
+        :rtype: dict
+        """
+        return {'team': team,
+                'channel': self.channel,
+                'ts': self.ts,
+                'title': self.title,
+                'text': self.text,
+                'deadline': self.deadline}
+
+    def vote(self, name, user):
+        """
+        Record a vote.
+
+        :param name: emoji name
+        :type name: str
+        :param user: user number, from :py:attr:`users`
+        :type user: int
+        :returns: whether it is a new vote.
+        :rtype: bool
+        """
+        if self.votes is None:
+            self.votes = {}
+        bits = self.votes.get(name, 0)
+        bit = 1 << user
+        if bits & bit:
+            return False
+        if not bits:
+            name = sys.intern(name)
+        self.votes[name] = bits | bit
+        if self.results is not None:
+            self.results.add(name, user)
+        return True
+
+    def unvote(self, name, user):
+        """
+        Withdraw a vote.
+
+        :returns: whether there was such a vote.
+        :rtype: bool
+        """
+        bits = self.votes.get(name, 0) if self.votes else 0
+        bit = 1 << user
+        if not bits & bit:
+            return False
+        bits ^= bit
+        if bits:
+            self.votes[name] = bits
+        else:
+            del self.votes[name]
+        if self.results is not None:
+            self.results.remove(name, user)
+        return True
+
+    def load(self, reactions):
+        """
+        Replace the votes with the reactions from ``reactions.get``.
+
+        :param reactions: the reactions of the message
+        :type reactions: list
+        """
+        self.votes = {sys.intern(r['name']): self.users.bits(r['users'])
+                      for r in reactions if r['users']}
+        self.stale = False
+        if self.results is not None:
+            self.results.reset(self.votes)
+
+    def voters(self, name):
+        """
+        Bitset of the voters of an option.
+
+        :rtype: int
+        """
+        return self.votes.get(name, 0) if self.votes else 0
+
+    def count(self, name):
+        """
+        Number of votes for an option.
+
+        :rtype: int
+        """
+        return popcount(self.voters(name))
+
+    def multiple(self, names=None):
+        """
+        Bitset of the users who voted for several options.
+
+        :param names: the options to consider, all of them by default
+        :type names: list
+        :rtype: int
+        """
+        if names is None:
+            names = self.votes or ()
+        seen = several = 0
+        for bits in map(self.voters, names):
+            several |= seen & bits
+            seen |= bits
+        return several
+
+
+class PollRegistry:
+    """The open polls of a bot, by message."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._polls = {}
+
+    def __len__(self):
+        """Number of open polls."""
+        return len(self._polls)
+
+    def __iter__(self):
+        """Iterate over the open polls."""
+        return iter(list(self._polls.values()))
+
+    def __contains__(self, key):
+        """Whether the ``(channel, ts)`` is an open poll."""
+        return key in self._polls
+
+    def add(self, poll):
+        """Register an open poll."""
+        self._polls[poll.key] = poll
+
+    def get(self, channel, ts):
+        """
+        Find an open poll.
+
+        :returns: the poll or ``None``.
+        :rtype: :py:class:`Poll`
+        """
+        return self._polls.get((channel, ts))
+
+    def pop(self, channel, ts):
+        """
+        Unregister a poll.
+
+        :returns: the poll or ``None`` if it wasn't open.
+        :rtype: :py:class:`Poll`
+        """
+        return self._polls.pop((channel, ts), None)
+
+    def mark_stale(self):
+        """Flag all the polls as possibly missing some reactions."""
+        for poll in self._polls.values():
+            poll.stale = True
@@ -0,0 +1,277 @@
+"""
+Rate limited scheduling of the Web API calls.
+
+Slack groups its methods into `rate limit tiers`_, each tier allowing a given
+number of calls per minute. ``chat.postMessage`` is special and allows about
+one message per second and per channel.
+
+The :py:class:`Scheduler` keeps a token bucket per tier (or per channel for
+``chat.postMessage``) and a priority queue of the pending calls. The most
+urgent call whose bucket has a token is sent first, and an HTTP 429 pauses its
+bucket for the ``Retry-After`` delay before the call is sent again.
+
+.. _rate limit tiers: https://api.slack.com/docs/rate-limits
+
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from .api import RateLimited
+from .config import API_CONCURRENCY
+
+LOG = logging.getLogger(__name__)
+
+PRIORITY_RESULTS = 0
+"""Closing a poll: fetching the votes, publishing the results."""
+
+PRIORITY_POLL = 1
+"""Publishing a new poll."""
+
+PRIORITY_NORMAL = 2
+"""Default priority."""
+
+PRIORITY_REACTIONS = 3
+"""Seeding the reactions of a poll."""
+
+PRIORITY_LIVE = 4
+"""Showing the votes of an open poll."""
+
+TIERS = {
+    1: 1 / 60,
+    2: 20 / 60,
+    3: 50 / 60,
+    4: 100 / 60,
+}
+"""Calls per second allowed by each tier."""
+
+METHOD_TIERS = {
+    'rtm.connect': 1,
+    'rtm.start': 1,
+    'conversations.list': 2,
+    'users.list': 2,
+    'chat.delete': 3,
+    'chat.update': 3,
+    'reactions.add': 3,
+    'reactions.get': 3,
+    'users.info': 4,
+}
+"""Tier of the known methods, the others are considered to be tier 3."""
+
+PER_CHANNEL = {
+    'chat.postMessage': 1,
+}
+"""Methods limited per channel rather than per tier, in calls per second."""
+
+BURST = 5
+"""Seconds worth of calls that may be sent at once."""
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    :param rate: tokens per second
+    :type rate: float
+    :param capacity: maximum number of tokens (burst), at least one so that
+                     the slow buckets can be used at all
+    :type capacity: float
+    """
+
+    def __init__(self, rate, capacity=None, *, clock=time.monotonic):
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.capacity = max(1, capacity or rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.paused_until = 0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self):
+        """
+        Seconds to wait until a token is available.
+
+        :rtype: float
+        """
+        now = self.clock()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """
+        Consume a token if available.
+
+        :returns: whether a token was consumed.
+        :rtype: bool
+        """
+        if self.delay():
+            return False
+        self.tokens -= 1
+        return True
+
+    def pause(self, seconds):
+        """Refuse any token for the next seconds, then allow a single one."""
+        now = self.clock()
+        self._refill(now)
+        self.tokens = min(self.tokens, 1)
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.updated = self.paused_until
+
+
+def bucket_key(method, kwargs):
+    """
+    Identify the rate limit a method call is subject to.
+
+    >>> bucket_key('reactions.add', {})
+    3
+    >>> bucket_key('chat.postMessage', {'channel': 'C1'})
+    ('chat.postMessage', 'C1')
+    """
+    if method in PER_CHANNEL:
+        return method, kwargs.get('channel')
+    return METHOD_TIERS.get(method, 3)
+
+
+class Scheduler:
+    """
+    Priority scheduler of the Web API calls.
+
+    :param client: the client performing the calls
+    :type client: :py:class:`votebot.api.Client`
+    :param concurrency: maximum number of calls in flight
+    :type concurrency: int
+    """
+
+    def __init__(self, client, *, concurrency=None):
+        """Initialize the scheduler, it starts with the first call."""
+        self.client = client
+        self.concurrency = concurrency or API_CONCURRENCY
+        self.buckets = {}
+        self.pending = {}
+        self.log = LOG
+        self._counter = itertools.count()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        """Number of calls waiting to be sent."""
+        return sum(len(heap) for heap in self.pending.values())
+
+    def submit(self, method, *, priority=PRIORITY_NORMAL, **kwargs):
+        r"""
+        Schedule an API call.
+
+        :param method: name of the method
+        :type method: str
+        :param priority: lower goes first
+        :type priority: int
+        :param \**kwargs: arguments of :py:meth:`votebot.api.Client.call`
+        :returns: the future response.
+        :rtype: :py:class:`asyncio.Future`
+        """
+        future = asyncio.Future()
+        self._push((priority, next(self._counter), method, kwargs, future))
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._dispatch())
+        return future
+
+    def close(self):
+        """Stop sending and cancel the pending calls."""
+        if self._task is not None:
+            self._task.cancel()
+        for heap in self.pending.values():
+            for *_, future in heap:
+                future.cancel()
+        self.pending.clear()
+
+    def _push(self, entry):
+        key = bucket_key(entry[2], entry[3])
+        if key not in self.buckets:
+            rate = PER_CHANNEL[key[0]] if isinstance(key, tuple) \
+                else TIERS[key]
+            self.buckets[key] = TokenBucket(rate, rate * BURST)
+        heapq.heappush(self.pending.setdefault(key, []), entry)
+        self._wakeup.set()
+
+    def _pop(self):
+        """
+        Pop the most urgent entry whose bucket has a token.
+
+        :returns: the entry or how long to wait for one.
+        :rtype: tuple
+        """
+        best = None
+        delay = None
+        for key, heap in list(self.pending.items()):
+            # The cancelled calls don't spend any token.
+            while heap and heap[0][-1].cancelled():
+                heapq.heappop(heap)
+            if not heap:
+                del self.pending[key]
+                continue
+            wait = self.buckets[key].delay()
+            if wait:
+                delay = wait if delay is None else min(delay, wait)
+            elif best is None or heap[0] < self.pending[best][0]:
+                best = key
+
+        if best is None:
+            return None, delay
+
+        self.buckets[best].take()
+        entry = heapq.heappop(self.pending[best])
+        if not self.pending[best]:
+            del self.pending[best]
+        return entry, None
+
+    @asyncio.coroutine
+    def _dispatch(self):
+        """Send the calls as fast as the rate limits allow it."""
+        while True:
+            yield from self._semaphore.acquire()
+            while True:
+                self._wakeup.clear()
+                entry, delay = self._pop()
+                if entry is not None:
+                    break
+                try:
+                    yield from asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            asyncio.ensure_future(self._send(entry))
+
+    @asyncio.coroutine
+    def _send(self, entry):
+        priority, _, method, kwargs, future = entry
+        try:
+            if future.cancelled():
+                return
+            # The client consumes the kwargs, keep them for a retry.
+            response = yield from self.client.call(method, **dict(kwargs))
+        except RateLimited as e:
+            self.log.warning('/api/%s rate limited, retry in %.1fs.',
+                             method, e.retry_after)
+            self.buckets[bucket_key(method, kwargs)].pause(e.retry_after)
+            self._push(entry)
+        except Exception as e:
+            if not future.cancelled():
+                future.set_exception(e)
+        else:
+            if not future.cancelled():
+                future.set_result(response)
+        finally:
+            self._semaphore.release()
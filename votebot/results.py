@@ -0,0 +1,229 @@
+"""
+Results of the polls.
+
+A :py:class:`Tally` follows the votes of a poll, one change at a time, and
+keeps its options ranked. Closing a poll, or showing its live results, reads
+the ranking instead of counting the voters again.
+
+The votes are reactions, so each user approves any number of options. They
+are counted according to one of the :py:data:`METHODS`:
+
+``approval``
+    one point for each option a user reacted with;
+``plurality``
+    one point for the only option a user reacted with, the users reacting
+    with several options are left out;
+``weighted``
+    each user has one point, shared among the options they reacted with;
+``irv``
+    instant-runoff, the order of the reactions of a user is their ranking.
+    The option with the fewest first choices is eliminated until one gets
+    a majority.
+
+>>> tally = Tally(['pizza', 'sushi', 'taco'], 'weighted')
+>>> for name, user in (('pizza', 1), ('sushi', 1), ('sushi', 2)):
+...     tally.add(name, user)
+>>> [(display(score), name) for score, name in tally.ranking()]
+[('1.50', 'sushi'), ('0.50', 'pizza'), ('0', 'taco')]
+"""
+
+import fractions
+import functools
+
+METHODS = ('approval', 'plurality', 'weighted', 'irv')
+"""The ways of counting the votes."""
+
+
+def display(score):
+    """
+    Format a score.
+
+    >>> display(3), display(fractions.Fraction(1, 3))
+    ('3', '0.33')
+    """
+    if score == int(score):
+        return str(int(score))
+    return '{0:.2f}'.format(float(score))
+
+
+@functools.lru_cache(maxsize=1024)
+def _ranks(options):
+    """Position of each option, shared by the tallies of the same options."""
+    return {name: i for i, name in enumerate(options)}
+
+
+class Tally:
+    """
+    Incremental counting of the votes of a poll.
+
+    The ranking is kept up to date with each vote: only the options whose
+    score changes move, past the neighbours they now beat. The ties are
+    broken by the order of the options.
+
+    :param options: emoji names offered as answers, in order
+    :type options: list
+    :param method: one of :py:data:`METHODS`
+    :type method: str
+    :param ignore: number of a user whose votes don't count, i.e. the bot
+    :type ignore: int
+    """
+
+    __slots__ = ('options', 'method', 'ignore', 'scores', 'choices',
+                 '_index', '_order', '_position', '_irv')
+
+    def __init__(self, options, method='approval', ignore=None):
+        """Initialize a tally without votes."""
+        if method not in METHODS:
+            raise ValueError('Unknown voting method: {0!r}.'.format(method))
+        # Without duplicates, in order.
+        names = []
+        for name in options:
+            if name not in names:
+                names.append(name)
+        self.options = tuple(names)
+        self.method = method
+        self.ignore = ignore
+        self._clear()
+
+    def __len__(self):
+        """Number of options."""
+        return len(self.options)
+
+    def _clear(self):
+        self.scores = dict.fromkeys(self.options, 0)
+        # The options of each user, in the order of their reactions. Only
+        # approval voting does without it.
+        self.choices = None if self.method == 'approval' else {}
+        self._index = _ranks(self.options)
+        self._order = list(self.options)
+        self._position = dict(self._index)
+        # Ranking of the last instant-runoff, until the next change.
+        self._irv = None
+
+    def add(self, name, user):
+        """
+        Record a vote, which must be new.
+
+        :param name: emoji name
+        :type name: str
+        :param user: user number
+        :type user: int
+        """
+        if name not in self._index or user == self.ignore:
+            return
+        if self.choices is None:
+            self._move(name, 1)
+            return
+        before = self.choices.get(user, ())
+        self._change(user, before, before + (name,))
+
+    def remove(self, name, user):
+        """Withdraw a vote, which must exist."""
+        if name not in self._index or user == self.ignore:
+            return
+        if self.choices is None:
+            self._move(name, -1)
+            return
+        before = self.choices.get(user, ())
+        self._change(user, before, tuple(n for n in before if n != name))
+
+    def reset(self, votes):
+        """
+        Count the votes from scratch.
+
+        The order in which each user reacted is unknown, the order of the
+        options stands for it.
+
+        :param votes: bitset of the voters by emoji name
+        :type votes: dict
+        """
+        self._clear()
+        votes = votes or {}
+        for name in self.options:
+            # Least significant bit first, as votebot.users.UserIndex.ids
+            digits = bin(votes.get(name, 0))[:1:-1]
+            user = digits.find('1')
+            while user >= 0:
+                self.add(name, user)
+                user = digits.find('1', user + 1)
+
+    def ranking(self, k=None):
+        """
+        Rank the options, best first.
+
+        :param k: number of options wanted, all of them by default
+        :type k: int
+        :returns: the score and emoji name of each option.
+        :rtype: list
+        """
+        if self.method == 'irv':
+            if self._irv is None:
+                self._irv = self._runoff()
+            return self._irv[:k]
+        return [(self.scores[name], name) for name in self._order[:k]]
+
+    def _change(self, user, before, after):
+        """Replace the choices of a user, only they are counted again."""
+        self._irv = None
+        if after:
+            self.choices[user] = after
+        else:
+            self.choices.pop(user, None)
+        if self.method == 'plurality':
+            if len(before) == 1:
+                self._move(before[0], -1)
+            if len(after) == 1:
+                self._move(after[0], 1)
+        elif self.method == 'weighted':
+            for name in before:
+                self._move(name, -fractions.Fraction(1, len(before)))
+            for name in after:
+                self._move(name, fractions.Fraction(1, len(after)))
+
+    def _move(self, name, delta):
+        """Change the score of an option, and its place in the ranking."""
+        score = self.scores[name] = self.scores[name] + delta
+        order, position, index = self._order, self._position, self._index
+        i = position[name]
+        key = (-score, index[name])
+        # Bubble it up, or down, past the options it now beats, or not.
+        while i > 0 and key < (-self.scores[order[i - 1]],
+                               index[order[i - 1]]):
+            order[i] = order[i - 1]
+            position[order[i]] = i
+            i -= 1
+        while i < len(order) - 1 and key > (-self.scores[order[i + 1]],
+                                            index[order[i + 1]]):
+            order[i] = order[i + 1]
+            position[order[i]] = i
+            i += 1
+        order[i] = name
+        position[name] = i
+
+    def _runoff(self):
+        """
+        Instant-runoff over the choices of the users.
+
+        :returns: the remaining options by their last count, then the
+                  eliminated ones, the last eliminated first.
+        :rtype: list
+        """
+        remaining = list(self.options)
+        ballots = list(self.choices.values())
+        eliminated = []
+        while True:
+            counts = dict.fromkeys(remaining, 0)
+            for ballot in ballots:
+                for name in ballot:
+                    if name in counts:
+                        counts[name] += 1
+                        break
+            ranked = sorted(remaining,
+                            key=lambda n: (-counts[n], self._index[n]))
+            total = sum(counts.values())
+            if len(ranked) <= 1 or counts[ranked[0]] * 2 > total:
+                break
+            loser = ranked[-1]
+            remaining.remove(loser)
+            eliminated.append((counts[loser], loser))
+        return [(counts[n], n) for n in ranked] + eliminated[::-1]
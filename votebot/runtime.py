@@ -0,0 +1,142 @@
+"""
+Many bots in a single process.
+
+A :py:class:`Runtime` hosts one :py:class:`votebot.bot.Bot` per workspace on
+the same event loop. They share the pooled HTTP client and the poll expiry
+timers, each keeps its own rate limits as Slack counts them per token.
+
+The workspaces are described in a JSON file, pointed to by the
+``VOTEBOT_CONFIG`` environment variable.
+
+.. code-block:: json
+
+    {
+        "workspaces": [
+            {"token": "xoxb-123", "channel": "general"},
+            {"token": "xoxb-456", "channel": "polls",
+             "channels": ["dev", "ops"], "timeout": 300}
+        ]
+    }
+
+``channel`` is where the polls go by default, a DM starting with the mention
+of one of the ``channels`` (e.g. ``#dev Lunch?``) goes there instead.
+"""
+
+import asyncio
+import json
+import logging
+
+from .api import Client
+from .bot import Bot
+from .metrics import serve
+from .timers import Timers
+
+LOG = logging.getLogger(__name__)
+
+BINDING_KEYS = frozenset(('token', 'channel', 'channels', 'timeout'))
+"""Keys allowed to describe a workspace."""
+
+
+def load_config(path):
+    """
+    Read the workspaces from a JSON configuration file.
+
+    :param path: path to the file
+    :type path: str
+    :returns: the keyword arguments of each bot
+    :rtype: list
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    workspaces = config.get('workspaces', [])
+    for i, workspace in enumerate(workspaces):
+        if 'token' not in workspace:
+            raise ValueError('Workspace #{0} has no token.'.format(i))
+        unknown = set(workspace).difference(BINDING_KEYS)
+        if unknown:
+            raise ValueError('Workspace #{0} has unknown keys: {1}.'
+                             .format(i, ', '.join(sorted(unknown))))
+    return workspaces
+
+
+class Runtime:
+    """
+    Bots sharing the same event loop.
+
+    :param client: HTTP client shared by the bots
+    :type client: :py:class:`votebot.api.Client`
+    :param timers: poll expiry timers shared by the bots
+    :type timers: :py:class:`votebot.timers.Timers`
+    :param store: persistence of the open polls, shared by the bots
+    :type store: :py:class:`votebot.store.Store`
+    :param metrics_port: port serving the metrics, none by default
+    :type metrics_port: int
+    """
+
+    def __init__(self, *, client=None, timers=None, store=None,
+                 metrics_port=None):
+        """Initialize an empty runtime."""
+        self.client = client or Client()
+        self.timers = Timers() if timers is None else timers
+        self.store = store
+        self.metrics_port = metrics_port
+        self.bots = []
+        self.log = LOG
+
+    def add(self, token, **kwargs):
+        r"""
+        Add a bot.
+
+        The bots are numbered in the order they are added, unless given an
+        ``index``.
+
+        :param token: its Slack token
+        :type token: str
+        :param \\**kwargs: see :py:class:`votebot.bot.Bot`
+        :rtype: :py:class:`votebot.bot.Bot`
+        """
+        kwargs.setdefault('index', len(self.bots))
+        bot = Bot(token,
+                  client=self.client,
+                  timers=self.timers,
+                  store=self.store,
+                  **kwargs)
+        self.bots.append(bot)
+        return bot
+
+    @asyncio.coroutine
+    def run(self):
+        """Run all the bots until they are all closed."""
+        server = monitor = None
+        if self.metrics_port:
+            server, monitor = yield from serve(port=self.metrics_port)
+        try:
+            results = yield from asyncio.gather(
+                *[bot.connect() for bot in self.bots])
+            for bot, result in zip(self.bots, results):
+                if isinstance(result, Exception):
+                    self.log.error('%s stopped: %s', bot, result)
+        finally:
+            if server is not None:
+                monitor.cancel()
+                server.close()
+            self.close()
+
+    def close(self):
+        """Close the bots, the timers, the store and the HTTP client."""
+        for bot in self.bots:
+            if not bot.future.done():
+                bot.future.set_result(None)
+        self.timers.close()
+        if self.store is not None:
+            self.store.close()
+        self.client.close()
+
+    def stats(self):
+        """
+        Runtime metrics of all the bots.
+
+        :rtype: dict
+        """
+        return {str(bot): bot.stats() for bot in self.bots}
@@ -0,0 +1,248 @@
+"""
+Durable storage of the open polls.
+
+The open polls are written to a store so that a restarted bot can pick them
+up again: the ones which expired in the meantime are closed right away, the
+others are scheduled as before.
+
+Writes are buffered and flushed in a background thread every
+``STORE_INTERVAL`` seconds, so persisting a poll costs nothing to the event
+loop. A crash loses at most the last interval worth of changes.
+
+Two backends are available, chosen by :py:func:`open_store` from the path:
+
+- :py:class:`SQLiteStore`, the default;
+- :py:class:`LogStore`, an append-only log of JSON lines (``.log`` or
+  ``.jsonl``), compacted when loaded. Only one process may use it, so it
+  cannot be used with several workers, see :py:mod:`votebot.supervisor`.
+
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+
+from .codec import dumps, loads
+from .config import STORE_INTERVAL
+
+LOG = logging.getLogger(__name__)
+
+FIELDS = ('team', 'channel', 'ts', 'title', 'text', 'deadline')
+"""Fields of a poll record, ``deadline`` is a UNIX timestamp."""
+
+LOG_SUFFIXES = ('.log', '.jsonl')
+"""Extensions of the paths opened as a :py:class:`LogStore`."""
+
+
+def shareable(path):
+    """
+    Whether several processes may use the store at the same time.
+
+    >>> shareable('votebot.sqlite3'), shareable('votebot.log')
+    (True, False)
+    """
+    return not path or not path.endswith(LOG_SUFFIXES)
+
+
+def open_store(path, *, shared=False):
+    """
+    Open the store matching the path.
+
+    :param path: path to the file, empty disables the persistence
+    :type path: str
+    :param shared: whether other processes use the same path
+    :type shared: bool
+    :raises ValueError: when the store cannot be shared
+    :rtype: :py:class:`Store`
+    """
+    if not path:
+        return None
+    if shared and not shareable(path):
+        raise ValueError('{0} may only be used by a single process, use a '
+                         'SQLite database with several workers.'.format(path))
+    if path.endswith(LOG_SUFFIXES):
+        return LogStore(path)
+    return SQLiteStore(path)
+
+
+class Store:
+    """
+    Batched storage of the poll records.
+
+    :param interval: seconds between two flushes
+    :type interval: float
+    """
+
+    def __init__(self, interval=None):
+        """Initialize the store."""
+        self.interval = STORE_INTERVAL if interval is None else interval
+        self.pending = []
+        self.log = LOG
+        self._handle = None
+        self._writing = None
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """
+        Record an open poll.
+
+        :param record: the values of :py:data:`FIELDS`
+        :type record: dict
+        """
+        self.pending.append(('add', {k: record[k] for k in FIELDS}))
+        self._schedule()
+
+    def remove(self, team, channel, ts):
+        """Forget a closed poll."""
+        self.pending.append(('remove', {'team': team,
+                                        'channel': channel,
+                                        'ts': ts}))
+        self._schedule()
+
+    def load(self, team):
+        """
+        Read the open polls of a team.
+
+        :param team: team identifier
+        :type team: str
+        :rtype: list
+        """
+        self.flush()
+        with self._lock:
+            return [r for r in self._read() if r['team'] == team]
+
+    def flush(self):
+        """Write the pending changes now."""
+        ops, self.pending = self.pending, []
+        if ops:
+            self._apply(ops)
+
+    def close(self):
+        """Write the pending changes and release the resources."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.flush()
+
+    def _schedule(self):
+        if self._handle is None:
+            loop = asyncio.get_event_loop()
+            self._handle = loop.call_later(self.interval, self._flush_later)
+
+    def _flush_later(self):
+        """Write the pending changes in a thread, one batch at a time."""
+        self._handle = None
+        if self._writing is not None and not self._writing.done():
+            self._schedule()
+            return
+
+        ops, self.pending = self.pending, []
+        if ops:
+            loop = asyncio.get_event_loop()
+            self._writing = loop.run_in_executor(None, self._apply, ops)
+            self._writing.add_done_callback(self._written)
+
+    def _written(self, future):
+        if future.exception() is not None:
+            self.log.error('Failed writing the polls: %s', future.exception())
+
+    def _apply(self, ops):
+        with self._lock:
+            self._write(ops)
+
+    def _read(self):
+        """Read all the records."""
+        raise NotImplementedError
+
+    def _write(self, ops):
+        """Apply a batch of ``('add'|'remove', record)`` operations."""
+        raise NotImplementedError
+
+
+class SQLiteStore(Store):
+    """
+    Poll records in a SQLite database.
+
+    :param path: path to the database
+    :type path: str
+    """
+
+    def __init__(self, path, interval=None):
+        """Open the database, creating the table if needed."""
+        super().__init__(interval)
+        self.path = path
+        # The connection is used by one thread at a time.
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS polls ('
+                            'team TEXT, channel TEXT, ts TEXT, title TEXT, '
+                            'text TEXT, deadline REAL, '
+                            'PRIMARY KEY (team, channel, ts))')
+
+    def close(self):
+        """Write the pending changes and close the database."""
+        super().close()
+        self.db.close()
+
+    def _read(self):
+        cursor = self.db.execute('SELECT {0} FROM polls ORDER BY deadline'
+                                 .format(', '.join(FIELDS)))
+        return [dict(zip(FIELDS, row)) for row in cursor]
+
+    def _write(self, ops):
+        with self.db:
+            for op, record in ops:
+                if op == 'add':
+                    self.db.execute(
+                        'INSERT OR REPLACE INTO polls ({0}) VALUES ({1})'
+                        .format(', '.join(FIELDS), ', '.join('?' * 6)),
+                        [record[k] for k in FIELDS])
+                else:
+                    self.db.execute(
+                        'DELETE FROM polls '
+                        'WHERE team = ? AND channel = ? AND ts = ?',
+                        (record['team'], record['channel'], record['ts']))
+
+
+class LogStore(Store):
+    """
+    Poll records in an append-only log of JSON lines.
+
+    :param path: path to the log
+    :type path: str
+    """
+
+    def __init__(self, path, interval=None):
+        """Initialize the store, the file is created on first write."""
+        super().__init__(interval)
+        self.path = path
+
+    def _read(self):
+        """Replay the log, then rewrite it with the open polls only."""
+        records = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        op, record = loads(line)
+                    except ValueError:
+                        # Torn write of a crash.
+                        continue
+                    key = (record['team'], record['channel'], record['ts'])
+                    if op == 'add':
+                        records[key] = record
+                    else:
+                        records.pop(key, None)
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for record in records.values():
+                f.write(dumps(['add', record]) + '\n')
+        os.replace(tmp, self.path)
+        return sorted(records.values(), key=lambda r: r['deadline'])
+
+    def _write(self, ops):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(dumps(op) + '\n' for op in ops))
@@ -0,0 +1,293 @@
+"""
+Several worker processes sharing the workspaces.
+
+When one event loop is not enough, the :py:class:`Supervisor` spawns worker
+processes, each running a :py:class:`votebot.runtime.Runtime` for its share of
+the workspaces. Workspaces are assigned by consistent hashing of their token,
+so changing the number of workers only moves a fraction of them.
+
+The workers send their log records and their metrics to the supervisor, which
+restarts the ones that crash.
+
+.. code-block:: shell
+
+    $ export VOTEBOT_CONFIG=workspaces.json
+    $ export VOTEBOT_WORKERS=4
+    $ python -m votebot
+
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+
+from .bot import backoff
+from .config import METRICS_PORT, POLL_STORE, STATS_INTERVAL
+from .store import shareable
+
+LOG = logging.getLogger(__name__)
+
+
+class HashRing:
+    """
+    Consistent hashing ring.
+
+    :param nodes: the nodes to spread the keys on
+    :type nodes: list
+    :param replicas: virtual nodes per node, smoothing the distribution
+    :type replicas: int
+
+    >>> ring = HashRing(range(3))
+    >>> ring.node_for('xoxb-123') == ring.node_for('xoxb-123')
+    True
+    """
+
+    def __init__(self, nodes, replicas=64):
+        """Place the nodes on the ring."""
+        points = sorted((self._hash('{0}-{1}'.format(node, i)), node)
+                        for node in nodes
+                        for i in range(replicas))
+        self.hashes = [h for h, _ in points]
+        self.nodes = [n for _, n in points]
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+    def node_for(self, key):
+        """
+        Find the node owning the key.
+
+        :param key: the key
+        :type key: str
+        """
+        i = bisect.bisect(self.hashes, self._hash(key)) % len(self.hashes)
+        return self.nodes[i]
+
+
+def shard(workspaces, workers):
+    """
+    Split the workspaces between the workers.
+
+    :param workspaces: keyword arguments of each bot
+    :type workspaces: list
+    :param workers: number of workers
+    :type workers: int
+    :returns: the workspaces of each worker
+    :rtype: list
+    """
+    ring = HashRing(range(workers))
+    shards = [[] for _ in range(workers)]
+    for workspace in workspaces:
+        shards[ring.node_for(workspace['token'])].append(workspace)
+    return shards
+
+
+class LogListener(logging.handlers.QueueListener):
+    """
+    Hand the records of the workers to the handlers of the supervisor.
+
+    Each handler only gets the records of its level and above, as
+    ``respect_handler_level`` does from Python 3.5.
+    """
+
+    def handle(self, record):
+        """Handle a record from a worker."""
+        record = self.prepare(record)
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def _worker(index, workspaces, logs, stats, level, store):
+    """Run a runtime for the given workspaces, in a worker process."""
+    # Imported here as the supervisor itself doesn't need them.
+    from .runtime import Runtime
+    from .store import open_store
+
+    # The records are filtered here, at the level of the supervisor: its
+    # handlers take all they get.
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(logs)]
+    root.setLevel(level)
+
+    # Each worker serves its own metrics, on consecutive ports.
+    runtime = Runtime(store=open_store(store, shared=True),
+                      metrics_port=METRICS_PORT and METRICS_PORT + index)
+    for workspace in workspaces:
+        runtime.add(**workspace)
+
+    @asyncio.coroutine
+    def report():
+        while True:
+            yield from asyncio.sleep(STATS_INTERVAL)
+            stats.put((index, runtime.stats()))
+
+    loop = asyncio.get_event_loop()
+    reporter = asyncio.ensure_future(report())
+    try:
+        loop.run_until_complete(runtime.run())
+    finally:
+        reporter.cancel()
+        loop.close()
+
+
+class Supervisor:
+    """
+    Spawn, watch and restart the worker processes.
+
+    :param workspaces: keyword arguments of each bot
+    :type workspaces: list
+    :param workers: number of worker processes
+    :type workers: int
+    :param store: path of the store shared by the workers
+    :type store: str
+    :raises ValueError: when the store cannot be shared
+    """
+
+    def __init__(self, workspaces, workers, store=None):
+        """Initialize the supervisor, nothing is started yet."""
+        self.store = POLL_STORE if store is None else store
+        if not shareable(self.store):
+            raise ValueError('{0} may only be used by a single process, use '
+                             'a SQLite database with several workers.'
+                             .format(self.store))
+        # Numbered before sharding, the bots of all the workers differ.
+        workspaces = [dict(w, index=i) for i, w in enumerate(workspaces)]
+        self.shards = [s for s in shard(workspaces, workers) if s]
+        self.processes = [None] * len(self.shards)
+        self.started = [0] * len(self.shards)
+        self.failures = [0] * len(self.shards)
+        self.restart_at = [0] * len(self.shards)
+        self.restarts = 0
+        self.metrics = {}
+        self.reported = 0
+        self.logs = multiprocessing.Queue()
+        self.stats_queue = multiprocessing.Queue()
+        self.log = LOG
+        self._running = False
+
+    def start(self, index):
+        """Start the worker of the given shard."""
+        process = multiprocessing.Process(
+            target=_worker,
+            name='votebot-{0}'.format(index),
+            args=(index, self.shards[index], self.logs, self.stats_queue,
+                  logging.getLogger().getEffectiveLevel(), self.store),
+            daemon=True)
+        process.start()
+        self.processes[index] = process
+        self.started[index] = time.monotonic()
+        self.log.info('Worker %d (pid %d) runs %d workspace(s).',
+                      index, process.pid, len(self.shards[index]))
+
+    def run(self, poll=1):
+        """
+        Run the workers until they all exit cleanly.
+
+        :param poll: seconds between two checks of the workers
+        :type poll: float
+        """
+        listener = LogListener(self.logs, *logging.getLogger().handlers)
+        listener.start()
+        self._running = True
+        try:
+            for index in range(len(self.shards)):
+                self.start(index)
+            while self._running and self.watch():
+                self.collect()
+                self.report()
+                time.sleep(poll)
+        finally:
+            self.stop()
+            listener.stop()
+
+    def watch(self):
+        """
+        Restart the crashed workers.
+
+        :returns: whether some workers are still running.
+        :rtype: bool
+        """
+        now = time.monotonic()
+        alive = False
+        for index, process in enumerate(self.processes):
+            if process is None:
+                if now >= self.restart_at[index]:
+                    self.start(index)
+                alive = True
+            elif process.is_alive():
+                alive = True
+            elif process.exitcode != 0:
+                # A worker which ran for a while gets a fresh backoff.
+                if now - self.started[index] > 60:
+                    self.failures[index] = 0
+                delay = backoff(self.failures[index])
+                self.failures[index] += 1
+                self.restarts += 1
+                self.log.error('Worker %d died (exit code %s), restarting '
+                               'in %.1fs.', index, process.exitcode, delay)
+                self.processes[index] = None
+                self.restart_at[index] = now + delay
+                alive = True
+        return alive
+
+    def collect(self):
+        """Gather the latest metrics sent by the workers."""
+        while True:
+            try:
+                index, stats = self.stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.metrics[index] = stats
+
+    def report(self, interval=None):
+        """
+        Log the metrics of all the workers, every so often.
+
+        :param interval: seconds between two reports
+        :type interval: float
+        """
+        interval = STATS_INTERVAL if interval is None else interval
+        now = time.monotonic()
+        if now - self.reported < interval:
+            return
+        self.reported = now
+        stats = self.stats()
+        queued = sum(b['queue']['depth'] for b in stats['bots'].values())
+        polls = sum(b['open_polls'] for b in stats['bots'].values())
+        calls = sum(b['pending_calls'] for b in stats['bots'].values())
+        self.log.info('%d worker(s), %d restart(s), %d bot(s): %d queued '
+                      'event(s), %d open poll(s), %d pending call(s).',
+                      stats['workers'], stats['restarts'], len(stats['bots']),
+                      queued, polls, calls)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug('Stats: %s', stats)
+
+    def stop(self):
+        """Terminate the workers."""
+        self._running = False
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join()
+
+    def stats(self):
+        """
+        Metrics of all the workers.
+
+        :rtype: dict
+        """
+        bots = {}
+        for stats in self.metrics.values():
+            bots.update(stats)
+        return {'workers': len(self.shards),
+                'restarts': self.restarts,
+                'bots': bots}
@@ -0,0 +1,309 @@
+"""
+Local stand-in for the Slack servers.
+
+:py:class:`FakeSlack` serves the subset of the Web API used by the bot and
+a Real-Time Messaging WebSocket on localhost. It can simulate a large
+workspace, network latency and rate limits, and lets a test or a benchmark
+play the users: sending direct messages and reacting to the polls.
+
+.. code-block:: python
+
+    slack = FakeSlack(users=10000, latency=0.01, rate_limits=True)
+    yield from slack.start()
+
+    bot = Bot('xoxb-fake', channel='general',
+              client=Client(base_url=slack.api_url))
+    bot.connect()
+    yield from slack.connected.wait()
+
+    slack.dm('U00000001', 'Lunch? :pizza: :sushi:')
+
+"""
+
+import asyncio
+import collections
+import itertools
+import math
+import random
+
+from aiohttp import MsgType, web
+
+from .codec import dumps, loads
+from .ratelimit import BURST, METHOD_TIERS, PER_CHANNEL, TIERS, TokenBucket
+
+BOT_ID = 'UBOT'
+"""User identifier of the bot."""
+
+TEAM_ID = 'T0'
+"""Identifier of the team."""
+
+
+class FakeSlack:
+    """
+    Fake Web API and RTM server.
+
+    :param users: number of users in the workspace
+    :type users: int
+    :param channels: names of the channels
+    :type channels: list
+    :param latency: seconds added to each API call
+    :type latency: float
+    :param jitter: random seconds added on top of the latency
+    :type jitter: float
+    :param rate_limits: calls per second by method, ``True`` to use the
+                        Slack tiers
+    :type rate_limits: dict or bool
+    """
+
+    def __init__(self, *, users=100, channels=('general', 'random'),
+                 latency=0, jitter=0, rate_limits=None):
+        """Initialize the workspace, the server is started separately."""
+        self.users = [{'id': 'U{0:08d}'.format(i),
+                       'name': 'user{0}'.format(i),
+                       'profile': {'real_name': 'User {0}'.format(i)}}
+                      for i in range(users)]
+        self.users.append({'id': BOT_ID, 'name': 'votebot', 'profile': {}})
+        self.channels = [{'id': 'C{0:08d}'.format(i), 'name': name,
+                          'is_private': False}
+                         for i, name in enumerate(channels)]
+        self.latency = latency
+        self.jitter = jitter
+        if rate_limits is True:
+            rate_limits = dict(PER_CHANNEL)
+            rate_limits.update({m: TIERS[t] for m, t in METHOD_TIERS.items()})
+        self.rate_limits = rate_limits or {}
+        self.buckets = {m: TokenBucket(r, r * BURST)
+                        for m, r in self.rate_limits.items()}
+        # Messages by (channel, ts), with their reactions.
+        self.messages = {}
+        self.calls = collections.Counter()
+        self.limited = collections.Counter()
+        self.sockets = set()
+        self.connected = asyncio.Event()
+        self._ts = itertools.count(1)
+        self._handler = None
+        self._server = None
+        self.url = None
+
+    @property
+    def api_url(self):
+        """Base URL of the Web API."""
+        return self.url + '/api/'
+
+    @asyncio.coroutine
+    def start(self, host='127.0.0.1', port=0):
+        """
+        Start serving.
+
+        :returns: the root URL.
+        :rtype: str
+        """
+        app = web.Application()
+        app.router.add_route('POST', '/api/{method}', self.handle_api)
+        app.router.add_route('GET', '/rtm', self.handle_rtm)
+        self._handler = app.make_handler()
+        loop = asyncio.get_event_loop()
+        self._server = yield from loop.create_server(self._handler,
+                                                     host, port)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        self.url = 'http://{0}:{1}'.format(host, port)
+        return self.url
+
+    @asyncio.coroutine
+    def close(self):
+        """Close the sockets and stop serving."""
+        for ws in list(self.sockets):
+            yield from ws.close()
+        self._server.close()
+        yield from self._server.wait_closed()
+        yield from self._handler.finish_connections(1)
+
+    def next_ts(self):
+        """Generate a new message timestamp."""
+        return '{0:.6f}'.format(1e9 + next(self._ts) / 1e6)
+
+    def send(self, event):
+        """Send an event to the connected RTM clients."""
+        data = dumps(event)
+        for ws in self.sockets:
+            ws.send_str(data)
+
+    def dm(self, user, text):
+        """
+        Send a direct message to the bot.
+
+        :param user: user identifier
+        :type user: str
+        :param text: the message
+        :type text: str
+        """
+        self.send({'type': 'message',
+                   'channel': 'D' + user[1:],
+                   'user': user,
+                   'text': text,
+                   'ts': self.next_ts()})
+
+    def react(self, user, channel, ts, name, added=True):
+        """
+        Add, or remove, a reaction of a user to a message.
+
+        :returns: whether the reactions changed.
+        :rtype: bool
+        """
+        message = self.messages.get((channel, ts))
+        if message is None:
+            return False
+        users = message['reactions'].setdefault(name, [])
+        if added == (user in users):
+            return False
+        if added:
+            users.append(user)
+        else:
+            users.remove(user)
+            if not users:
+                del message['reactions'][name]
+        self.send({'type': 'reaction_added' if added else 'reaction_removed',
+                   'user': user,
+                   'reaction': name,
+                   'item': {'type': 'message', 'channel': channel, 'ts': ts},
+                   'event_ts': self.next_ts()})
+        return True
+
+    def polls(self):
+        """Messages posted by the bot which are still there."""
+        return [m for m in self.messages.values() if m['user'] == BOT_ID]
+
+    @asyncio.coroutine
+    def handle_api(self, request):
+        """Serve the Web API."""
+        method = request.match_info['method']
+        self.calls[method] += 1
+
+        bucket = self.buckets.get(method)
+        if bucket is not None and not bucket.take():
+            self.limited[method] += 1
+            return web.Response(
+                status=429,
+                headers={'Retry-After': str(math.ceil(bucket.delay()))})
+
+        if self.latency or self.jitter:
+            yield from asyncio.sleep(self.latency +
+                                     random.uniform(0, self.jitter))
+
+        form = yield from request.post()
+        handler = getattr(self, 'api_' + method.replace('.', '_'), None)
+        if handler is None:
+            body = {'ok': False, 'error': 'unknown_method'}
+        else:
+            body = handler(form)
+        return web.Response(body=dumps(body).encode('utf-8'),
+                            content_type='application/json')
+
+    @asyncio.coroutine
+    def handle_rtm(self, request):
+        """Serve the RTM WebSocket."""
+        ws = web.WebSocketResponse()
+        yield from ws.prepare(request)
+        self.sockets.add(ws)
+        ws.send_str(dumps({'type': 'hello'}))
+        self.connected.set()
+        try:
+            while True:
+                msg = yield from ws.receive()
+                if msg.tp != MsgType.text:
+                    break
+                event = loads(msg.data)
+                if event.get('type') == 'ping':
+                    ws.send_str(dumps({'type': 'pong',
+                                       'reply_to': event.get('id')}))
+        finally:
+            self.sockets.discard(ws)
+            if not self.sockets:
+                self.connected.clear()
+        return ws
+
+    def _page(self, form, items, key):
+        start = int(form.get('cursor') or 0)
+        limit = int(form.get('limit') or 100)
+        end = start + limit
+        return {'ok': True,
+                key: items[start:end],
+                'response_metadata': {
+                    'next_cursor': str(end) if end < len(items) else ''}}
+
+    def api_api_test(self, form):
+        """Check the API."""
+        return {'ok': True}
+
+    def api_rtm_connect(self, form):
+        """Point to the RTM WebSocket."""
+        return {'ok': True,
+                'url': self.url.replace('http', 'ws', 1) + '/rtm',
+                'self': {'id': BOT_ID, 'name': 'votebot'},
+                'team': {'id': TEAM_ID, 'domain': 'fake'}}
+
+    def api_users_list(self, form):
+        """List the users, by page."""
+        return self._page(form, self.users, 'members')
+
+    def api_users_info(self, form):
+        """Get a user."""
+        for user in self.users:
+            if user['id'] == form.get('user'):
+                return {'ok': True, 'user': user}
+        return {'ok': False, 'error': 'user_not_found'}
+
+    def api_conversations_list(self, form):
+        """List the channels, by page."""
+        return self._page(form, self.channels, 'channels')
+
+    def api_chat_postMessage(self, form):
+        """Post a message."""
+        ts = self.next_ts()
+        channel = form['channel']
+        self.messages[channel, ts] = {
+            'channel': channel,
+            'ts': ts,
+            'user': BOT_ID,
+            'text': form.get('text', ''),
+            'attachments': loads(form.get('attachments', '[]')),
+            'reactions': collections.OrderedDict(),
+        }
+        return {'ok': True, 'channel': channel, 'ts': ts}
+
+    def api_chat_update(self, form):
+        """Update a message."""
+        message = self.messages.get((form['channel'], form['ts']))
+        if message is None:
+            return {'ok': False, 'error': 'message_not_found'}
+        message['text'] = form.get('text', message['text'])
+        if 'attachments' in form:
+            message['attachments'] = loads(form['attachments'])
+        return {'ok': True, 'channel': form['channel'], 'ts': form['ts']}
+
+    def api_chat_delete(self, form):
+        """Delete a message."""
+        if self.messages.pop((form['channel'], form['ts']), None) is None:
+            return {'ok': False, 'error': 'message_not_found'}
+        return {'ok': True, 'channel': form['channel'], 'ts': form['ts']}
+
+    def api_reactions_add(self, form):
+        """React to a message, as the bot."""
+        if (form['channel'], form['timestamp']) not in self.messages:
+            return {'ok': False, 'error': 'message_not_found'}
+        if not self.react(BOT_ID, form['channel'], form['timestamp'],
+                          form['name']):
+            return {'ok': False, 'error': 'already_reacted'}
+        return {'ok': True}
+
+    def api_reactions_get(self, form):
+        """Get the reactions to a message."""
+        message = self.messages.get((form['channel'], form['timestamp']))
+        if message is None:
+            return {'ok': False, 'error': 'message_not_found'}
+        reactions = [{'name': name, 'users': users, 'count': len(users)}
+                     for name, users in message['reactions'].items()]
+        return {'ok': True,
+                'type': 'message',
+                'channel': form['channel'],
+                'message': {'ts': message['ts'], 'reactions': reactions}}
@@ -0,0 +1,172 @@
+"""
+Deadline scheduler.
+
+All the timers live in a single heap ordered by deadline and are fired by one
+task sleeping until the earliest of them. An open poll costs a heap entry
+instead of a sleeping coroutine, and cancelling or moving a timer is a
+``O(log n)`` operation.
+
+.. code-block:: python
+
+    timers = Timers()
+    timer = timers.schedule(60, print, 'one minute later')
+    timers.reschedule(timer, 120)
+
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+class Timer:
+    """
+    Handle on a scheduled callback.
+
+    :param deadline: loop time at which the callback is called
+    :type deadline: float
+    """
+
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, callback, args):
+        """Initialize the timer."""
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __repr__(self):
+        """String representation."""
+        return '<Timer({0!r} at {1:.1f})>'.format(self.callback,
+                                                  self.deadline)
+
+
+class Timers:
+    """Heap of timers driven by a single task."""
+
+    def __init__(self):
+        """Initialize an empty heap, the task starts with the first timer."""
+        self.heap = []
+        self.log = LOG
+        self._live = 0
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        """Number of pending timers."""
+        return self._live
+
+    def time(self):
+        """Current loop time."""
+        return asyncio.get_event_loop().time()
+
+    def schedule(self, delay, callback, *args):
+        r"""
+        Call ``callback(*args)`` in ``delay`` seconds.
+
+        When the callback returns a coroutine, it is run as a task.
+
+        :param delay: seconds
+        :type delay: float
+        :param callback: the function to call
+        :param \*args: its arguments
+        :rtype: :py:class:`Timer`
+        """
+        return self.schedule_at(self.time() + delay, callback, *args)
+
+    def schedule_at(self, deadline, callback, *args):
+        """
+        Call ``callback(*args)`` at the given loop time.
+
+        :rtype: :py:class:`Timer`
+        """
+        timer = Timer(deadline, callback, args)
+        self._live += 1
+        self._push(timer)
+        return timer
+
+    def reschedule(self, timer, delay):
+        """Move the deadline of a pending timer to ``delay`` seconds away."""
+        self.reschedule_at(timer, self.time() + delay)
+
+    def reschedule_at(self, timer, deadline):
+        """Move the deadline of a pending timer to the given loop time."""
+        if timer.cancelled:
+            raise ValueError('{0!r} is not pending.'.format(timer))
+        # The previous entry is left in the heap and skipped once popped.
+        timer.deadline = deadline
+        self._push(timer)
+
+    def cancel(self, timer):
+        """Cancel a pending timer."""
+        if not timer.cancelled:
+            timer.cancelled = True
+            self._live -= 1
+            # Get rid of the dead entries once they outnumber the live ones.
+            if len(self.heap) > 64 and len(self.heap) > 2 * self._live:
+                self.heap = [e for e in self.heap
+                             if not e[2].cancelled and e[0] == e[2].deadline]
+                heapq.heapify(self.heap)
+
+    def close(self):
+        """Stop the task, the pending timers will never fire."""
+        if self._task is not None:
+            self._task.cancel()
+        for *_, timer in self.heap:
+            timer.cancelled = True
+        self.heap.clear()
+        self._live = 0
+
+    def _push(self, timer):
+        entry = (timer.deadline, next(self._counter), timer)
+        heapq.heappush(self.heap, entry)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        elif self.heap[0] is entry:
+            self._wakeup.set()
+
+    def _pop_expired(self):
+        """
+        Pop the next expired timer.
+
+        :returns: the timer or how long to wait for one.
+        :rtype: tuple
+        """
+        now = self.time()
+        while self.heap:
+            deadline, _, timer = self.heap[0]
+            if timer.cancelled or deadline != timer.deadline:
+                heapq.heappop(self.heap)
+            elif deadline <= now:
+                heapq.heappop(self.heap)
+                timer.cancelled = True
+                self._live -= 1
+                return timer, None
+            else:
+                return None, deadline - now
+        return None, None
+
+    @asyncio.coroutine
+    def _run(self):
+        """Fire the timers as they expire."""
+        while True:
+            self._wakeup.clear()
+            timer, delay = self._pop_expired()
+            if timer is None:
+                try:
+                    yield from asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception:
+                self.log.exception('%r failed.', timer)
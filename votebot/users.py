@@ -0,0 +1,201 @@
+"""
+Directory of the user names.
+
+Rather than loading the whole workspace at startup, the bot keeps the names
+of the users it has recently seen in a :py:class:`UserCache`. The RTM events
+about the users keep it warm, and a missing user is fetched with
+``users.info``. Concurrent lookups of the same user share the same call.
+
+The votes refer to the users by small integers, given by the
+:py:class:`UserIndex` of each poll, so that its voters fit in a bitset. The
+numbers go away with the poll.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+
+from .config import USER_CACHE_SIZE, USER_CACHE_TTL
+
+LOG = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    Least recently used cache of the user names, whose entries expire.
+
+    :param fetch: coroutine function returning the user object of an id,
+                  or ``None``
+    :type fetch: callable
+    :param size: maximum number of users kept
+    :type size: int
+    :param ttl: seconds before a name is fetched again
+    :type ttl: float
+    :param clock: source of the time
+    :type clock: callable
+    """
+
+    def __init__(self, fetch, *, size=None, ttl=None, clock=time.monotonic):
+        """Initialize an empty cache."""
+        self.fetch = fetch
+        self.size = size or USER_CACHE_SIZE
+        self.ttl = USER_CACHE_TTL if ttl is None else ttl
+        self.clock = clock
+        self.log = LOG
+        # id -> (name, expiry), the most recently used last.
+        self._entries = collections.OrderedDict()
+        self._pending = {}
+
+    def __len__(self):
+        """Number of cached users."""
+        return len(self._entries)
+
+    def __contains__(self, id_):
+        """Whether the name of the user is cached."""
+        return self.get(id_) is not None
+
+    def get(self, id_):
+        """
+        Look up a user name in the cache only.
+
+        :param id_: user identifier
+        :type id_: str
+        :returns: the name or ``None``.
+        :rtype: str
+        """
+        entry = self._entries.get(id_)
+        if entry is None:
+            return None
+        if entry[1] <= self.clock():
+            del self._entries[id_]
+            return None
+        self._entries.move_to_end(id_)
+        return entry[0]
+
+    def put(self, id_, name):
+        """Record the name of a user, evicting the least recently used."""
+        self._entries[id_] = (name, self.clock() + self.ttl)
+        self._entries.move_to_end(id_)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def update(self, users):
+        """
+        Record the names of the given users.
+
+        :param users: user objects from the Slack API
+        :type users: list
+        """
+        for user in users:
+            self.put(user['id'], user['name'])
+
+    @asyncio.coroutine
+    def resolve(self, id_):
+        """
+        Look up a user name, fetching it when missing.
+
+        :param id_: user identifier
+        :type id_: str
+        :returns: the name or ``None`` if it cannot be found.
+        :rtype: str
+        """
+        name = self.get(id_)
+        if name is not None:
+            return name
+
+        future = self._pending.get(id_)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(id_))
+            self._pending[id_] = future
+            future.add_done_callback(lambda f: self._pending.pop(id_, None))
+        # A cancelled lookup must not cancel the others.
+        return (yield from asyncio.shield(future))
+
+    @asyncio.coroutine
+    def _fetch(self, id_):
+        try:
+            user = yield from self.fetch(id_)
+        except Exception as e:
+            self.log.error('Failed fetching %s: %s', id_, e)
+            return None
+        if user is None:
+            return None
+        self.put(user['id'], user['name'])
+        return user['name']
+
+
+class UserIndex:
+    """
+    Small integers standing for the user ids of a poll.
+
+    The numbers are given in order of appearance, so the voters of a poll
+    are stored as the bits of an ``int``: one bit per user rather than one
+    string. Each poll numbers its own users, the bitsets are as wide as its
+    voters are many.
+
+    >>> index = UserIndex()
+    >>> bits = index.bits(['U1', 'U2'])
+    >>> bits & index.bits(['U2', 'U3']) == index.bits(['U2'])
+    True
+    >>> index.ids(bits)
+    ['U1', 'U2']
+    """
+
+    __slots__ = ('_numbers',)
+
+    def __init__(self):
+        """Initialize an empty index."""
+        # The ids are only needed back when a poll closes, they aren't kept
+        # in a list too.
+        self._numbers = {}
+
+    def __len__(self):
+        """Number of indexed users."""
+        return len(self._numbers)
+
+    def number(self, id_):
+        """
+        Get the number of a user, giving it one if needed.
+
+        :param id_: user identifier
+        :type id_: str
+        :rtype: int
+        """
+        number = self._numbers.get(id_)
+        if number is None:
+            number = self._numbers[id_] = len(self._numbers)
+        return number
+
+    def bits(self, ids):
+        """
+        Convert user ids to a bitset.
+
+        :param ids: user identifiers
+        :type ids: list
+        :rtype: int
+        """
+        bits = 0
+        for id_ in ids:
+            bits |= 1 << self.number(id_)
+        return bits
+
+    def ids(self, bits):
+        """
+        Convert a bitset back to user ids.
+
+        :param bits: the bitset
+        :type bits: int
+        :rtype: list
+        """
+        users = [None] * len(self._numbers)
+        for id_, number in self._numbers.items():
+            users[number] = id_
+        # Least significant bit first, scanning the string is linear.
+        digits = bin(bits)[:1:-1]
+        ids = []
+        i = digits.find('1')
+        while i >= 0:
+            ids.append(users[i])
+            i = digits.find('1', i + 1)
+        return ids
@@ -1,6 +1,11 @@
 """Utilitary functions."""
 import re
 
+_EMOJIS = re.compile(r':[:a-zA-Z0-9+\-_, ]+$')
+_SPLIT = re.compile('[, ]')
+_SEPARATORS = re.compile(r'::skin-tone-|:(?=::skin-tone-)|::|[, ]')
+_CHANNEL = re.compile(r'\s*<#([CG][A-Z0-9]+)(?:\|[^>]*)?>\s*')
+
 
 def extract(message):
     """Split the message and the emojis to be voted for.
@@ -19,18 +24,59 @@ def extract(message):
     >>> extract('No emoji')
     ('No emoji', [':+1:', ':heart:'])
 
+    >>> extract('Skin :nose::skin-tone-2: :ear:')
+    ('Skin', [':nose::skin-tone-2:', ':ear:'])
+
     .. note:: if no emojis are found after the question, you'll automagically
               get the ``:+1:`` as well as the ``:heart:``.
     """
-    # FIXME: ugly hack to preserve skin tone.
-    message = re.sub(r'::skin-tone-', '§§skin-tone-', message)
-    match = re.search(r':[:a-zA-Z0-9+\-_, §]+$', message)
+    match = _EMOJIS.search(message)
     if not match:
         return message, [':+1:', ':heart:']
 
-    query = message[0:match.span()[0]].strip()
-    emojis = re.split('[, ]',
-                      match.group(0)
-                           .replace('::', ': :')
-                           .replace('§§skin-tone', '::skin-tone'))
-    return query, emojis
+    start, end = match.span()
+    # A lone skin tone modifier doesn't start an emoji.
+    while message.startswith('::skin-tone-', start):
+        start = message.find(':', start + 2, end - 1)
+        if start < 0:
+            return message, [':+1:', ':heart:']
+
+    # Split on the separators and between two glued emojis (``::``).
+    if message.find('skin-tone-', start, end) < 0:
+        return (message[:start].strip(),
+                _SPLIT.split(message[start:end].replace('::', ': :')))
+
+    # Same, unless the latter is a skin tone modifier.
+    emojis = []
+    begin = start
+    for match in _SEPARATORS.finditer(message, start, end):
+        sep = match.group()
+        if sep == '::':
+            emojis.append(message[begin:match.start() + 1])
+            begin = match.start() + 1
+        elif sep in (',', ' '):
+            emojis.append(message[begin:match.start()])
+            begin = match.end()
+    emojis.append(message[begin:end])
+    return message[:start].strip(), emojis
+
+
+def extract_channel(message):
+    """Split the channel mentioned at the start of the message.
+
+    :param message: the message to be parsed.
+    :type message: str
+    :returns: the channel identifier, or ``None``, and the rest of the
+              message.
+    :rtype: tuple
+
+    >>> extract_channel('<#C024BE7LR|general> Lunch? :pizza:')
+    ('C024BE7LR', 'Lunch? :pizza:')
+
+    >>> extract_channel('Lunch with <#C024BE7LR>? :pizza:')
+    (None, 'Lunch with <#C024BE7LR>? :pizza:')
+    """
+    match = _CHANNEL.match(message)
+    if not match:
+        return None, message
+    return match.group(1), message[match.end():]